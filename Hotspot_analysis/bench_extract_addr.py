@@ -0,0 +1,66 @@
+"""
+meta → address_name 추출 벤치마크
+- 기존: 행마다 ast.literal_eval (extract_addr)
+- 신규: extract_addr_column (고유 meta만 정규식 파싱, literal_eval은 불량 행 폴백)
+사용: python bench_extract_addr.py [행 수] [고유 meta 수]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from hotspot import extract_addr, extract_addr_column
+
+# ========= 설정 =========
+N_ROWS = 3_000_000
+N_UNIQUE = 50_000        # 같은 상점 meta가 분기·업종별로 반복되는 실데이터 형태를 흉내
+MALFORMED_RATIO = 0.001  # literal_eval 폴백 경로를 타는 불량 meta 비율
+# 정규식 경로가 잡으면 안 되는 meta (extract_addr 기준 None): 중첩 dict 안의 키 / 따옴표 값 안의 키
+EDGE_META = [
+    "{'info': {'address_name': '수원시 A'}}",
+    '{\'k\': "\'address_name\': \'F\',"}',
+]
+SEED = 0
+# ========================
+
+
+def make_meta(n_rows: int, n_unique: int, seed=SEED) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    gu = np.array(["장안구", "권선구", "팔달구", "영통구"])
+    sigun = np.where(rng.random(n_unique) < 0.3, "수원시", "화성시")
+    lon = rng.uniform(126.95, 127.10, n_unique)
+    lat = rng.uniform(37.24, 37.35, n_unique)
+    uniques = [
+        str({"address_name": f"경기 {s} {gu[i % 4]} 테스트동 {i}",
+             "category_group_code": "FD6",
+             "road_address_name": f"경기 {s} {gu[i % 4]} 테스트로 {i}",
+             "x": f"{x:.7f}", "y": f"{y:.7f}"})
+        for i, (s, x, y) in enumerate(zip(sigun, lon, lat))
+    ]
+    bad = rng.random(n_unique) < MALFORMED_RATIO
+    uniques = [u[:-5] if b else u for u, b in zip(uniques, bad)] + EDGE_META
+    return pd.Series(np.asarray(uniques, dtype=object)[rng.integers(0, n_unique, n_rows)])
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else N_ROWS
+    n_unique = int(sys.argv[2]) if len(sys.argv) > 2 else N_UNIQUE
+    meta = make_meta(n_rows, n_unique)
+    print(f"meta {n_rows:,}행 (고유 {meta.nunique():,}개)")
+
+    t0 = time.perf_counter()
+    old = [extract_addr(s) for s in meta]
+    t_old = time.perf_counter() - t0
+    print(f"기존 literal_eval: {t_old:.2f}s")
+
+    t0 = time.perf_counter()
+    new = extract_addr_column(meta)
+    t_new = time.perf_counter() - t0
+    print(f"벡터화 추출     : {t_new:.2f}s (x{t_old / t_new:.1f})")
+
+    same = pd.Series(old, dtype=object).fillna("<NA>").equals(new.fillna("<NA>"))
+    print("결과 일치" if same else "⚠️ 결과 불일치")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+hotspot.py 파이프라인 단계별 벤치마크 (합성 데이터)
+- 수원 BBOX 안의 군집형 상권 지점(가우시안 군집 + 로그정규 매출) CSV를 크기별로 생성
+- 단계: load_sales_csv(실제 로더: 청크 읽기 + 시군 필터) / snapping(build_points_gdf)
+        / weights(투영 + KNN bi-square) / gi_<컬럼>(컬럼별 Gi* 순열 검정) / export(CSV·GeoJSON·Parquet)
+- 로더 내부 분해(load_breakdown, 합계 제외): load(read_sales_chunks: CSV 읽기·숫자화)
+        / addr_filter(filter_sales_chunks: meta 주소 추출·시군 필터) — load_sales_csv와 같은 함수
+- 단계마다 wall time과 tracemalloc 최대 메모리(MB, 메인 프로세스 기준)를 JSON 보고서로 저장
+사용: python bench_hotspot.py [크기,...] [순열 수]
+      예) python bench_hotspot.py 1000,10000 99
+"""
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+import hotspot
+from hotspot import (SUWON_BBOX, METRIC_CRS, K_NEIGHBORS, GI_COLUMNS, RANDOM_SEED,
+                     load_sales_csv, read_sales_chunks, filter_sales_chunks, build_points_gdf,
+                     add_metric_xy, knn_bisquare_coords, assign_gi)
+from result_io import write_columnar, write_points_geojson
+
+# ========= 설정 =========
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+PERMUTATIONS = 99          # 벤치마크용 (실제 분석은 hotspot.PERMUTATIONS)
+WORKERS = hotspot.WORKERS
+N_CLUSTERS = 60            # 상권 군집 수
+CLUSTER_STD_DEG = 0.002    # 군집 반경 (약 200 m)
+SUWON_RATIO = 0.7          # meta 주소가 수원시인 행 비율 (나머지는 필터에서 빠짐)
+REPORT_JSON = "bench_hotspot_report.json"
+SEED = 0
+# ========================
+
+
+def make_sales_csv(path: str, n_rows: int, seed=SEED) -> str:
+    """수원 BBOX 안 군집형 합성 매출 CSV (AMT/NOC/lat/lon/meta)."""
+    rng = np.random.default_rng(seed)
+    b = SUWON_BBOX
+    centers = np.column_stack([rng.uniform(b["min_lon"], b["max_lon"], N_CLUSTERS),
+                               rng.uniform(b["min_lat"], b["max_lat"], N_CLUSTERS)])
+    weight = rng.pareto(1.5, N_CLUSTERS) + 1
+    cl = rng.choice(N_CLUSTERS, size=n_rows, p=weight / weight.sum())
+    lon = centers[cl, 0] + rng.normal(0, CLUSTER_STD_DEG, n_rows)
+    lat = centers[cl, 1] + rng.normal(0, CLUSTER_STD_DEG, n_rows)
+
+    amt = np.round(rng.lognormal(15 + 0.02 * weight[cl], 1.0))
+    noc = np.maximum(1, np.round(amt / rng.uniform(8_000, 30_000, n_rows)))
+
+    # 같은 상점 meta가 여러 행(분기·업종)에 반복되는 실데이터 형태: 고유 meta는 행 수의 1/4
+    n_meta = max(1, n_rows // 4)
+    gu = np.array(["장안구", "권선구", "팔달구", "영통구"])
+    sigun = np.where(rng.random(n_meta) < SUWON_RATIO, "수원시", "화성시")
+    metas = np.array([str({"address_name": f"경기 {s} {gu[i % 4]} 테스트동 {i}",
+                           "category_group_code": "FD6"})
+                      for i, s in enumerate(sigun)], dtype=object)
+
+    pd.DataFrame({"AMT": amt, "NOC": noc, "lat": lat, "lon": lon,
+                  "meta": metas[rng.integers(0, n_meta, n_rows)]}).to_csv(path, index=False)
+    return path
+
+
+def run_stage(report: dict, name: str, fn, *args, **kwargs):
+    """fn 실행 시간·최대 메모리를 report[name]에 기록하고 결과 반환."""
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    wall = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] - base
+    report[name] = {"wall_s": round(wall, 4), "peak_mb": round(peak / 2 ** 20, 2)}
+    print(f"  {name:<14} {wall:8.2f}s  {peak / 2 ** 20:9.1f} MB")
+    return out
+
+
+def load_stage(path: str) -> list:
+    """로더 읽기 단계만 (청크를 모두 메모리에 모음 — 필터 단계와 분리해 재기 위함)."""
+    return list(read_sales_chunks(path))
+
+
+def weights_stage(gdf):
+    add_metric_xy(gdf, METRIC_CRS)
+    return knn_bisquare_coords(gdf[["x", "y"]].to_numpy(), k=K_NEIGHBORS,
+                               row_standardize=True, cache_dir=None)
+
+
+def export_stage(gdf, out_dir: str):
+    cols = [c for c in gdf.columns if c not in ("x", "y", "geometry")]
+    gdf[cols].to_csv(os.path.join(out_dir, "bench_gi_scores.csv"), index=False)
+    write_points_geojson(gdf[cols], os.path.join(out_dir, "bench_gi.geojson"))
+    try:
+        write_columnar(gdf[cols + ["geometry"]], os.path.join(out_dir, "bench_gi.parquet"))
+    except ImportError:
+        pass
+
+
+def bench_size(n_rows: int, permutations=PERMUTATIONS, workers=WORKERS) -> dict:
+    report = {"n_rows": n_rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = make_sales_csv(os.path.join(tmp, "sales.csv"), n_rows)
+        report["csv_mb"] = round(os.path.getsize(csv) / 2 ** 20, 2)
+
+        stages = {}
+        tracemalloc.start()
+        try:
+            df = run_stage(stages, "load_sales_csv", load_sales_csv, csv)
+            gdf = run_stage(stages, "snapping", build_points_gdf, df)
+            w = run_stage(stages, "weights", weights_stage, gdf)
+            for c in GI_COLUMNS:
+                run_stage(stages, f"gi_{c.lower()}", assign_gi, gdf, [c], w,
+                          permutations=permutations, seed=RANDOM_SEED, workers=workers)
+            run_stage(stages, "export", export_stage, gdf, tmp)
+
+            # 로더 내부 분해: 같은 read_sales_chunks / filter_sales_chunks를 단계별로
+            breakdown = {}
+            chunks = run_stage(breakdown, "load", load_stage, csv)
+            run_stage(breakdown, "addr_filter", filter_sales_chunks, chunks)
+            del chunks
+        finally:
+            tracemalloc.stop()
+
+    report["n_points"] = int(len(gdf))
+    report["stages"] = stages
+    report["load_breakdown"] = breakdown
+    report["total_s"] = round(sum(s["wall_s"] for s in stages.values()), 4)
+    return report
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else SIZES
+    permutations = int(sys.argv[2]) if len(sys.argv) > 2 else PERMUTATIONS
+
+    results = []
+    for n in sizes:
+        print(f"▶ {n:,}행 (순열 {permutations}, workers {WORKERS})")
+        results.append(bench_size(n, permutations))
+        print(f"  지점 {results[-1]['n_points']:,}개, 합계 {results[-1]['total_s']:.2f}s")
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "cpu_count": os.cpu_count(),
+        "workers": WORKERS,
+        "permutations": permutations,
+        "k": K_NEIGHBORS,
+        "results": results,
+    }
+    with open(REPORT_JSON, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 벤치마크 보고서 저장: {REPORT_JSON}")
+
+
+if __name__ == "__main__":
+    main()
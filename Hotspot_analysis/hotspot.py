@@ -1,11 +1,18 @@
 import os
 import ast
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
-from libpysal.weights import KNN, W
-from esda.getisord import G_Local
+from pyproj import Transformer
+from scipy import sparse
+from scipy.spatial import cKDTree
+from scipy.stats import beta
+from libpysal.weights import KNN, W, WSP
+
+from result_io import write_columnar, write_points_geojson
 
 # ========= 설정 =========
 INPUT_CSV = "경기도골목상권매출_위경도(2).csv"
@@ -13,16 +20,74 @@ INPUT_CSV = "경기도골목상권매출_위경도(2).csv"
 # 주소 기반 필터가 실패할 때만 쓰는 BBOX(수원 대략 범위) — 필요시 조정
 SUWON_BBOX = {"min_lon": 126.95, "max_lon": 127.10, "min_lat": 37.24, "max_lat": 37.35}
 
+# 분석 대상 시군 (다른 시군은 SIGUN/SIGUN_BBOX만 바꾸면 됨, BBOX 폴백이 필요 없으면 None)
+SIGUN = "수원시"
+SIGUN_BBOX = SUWON_BBOX
+
+# CSV 청크 크기(행) — 청크마다 시군 필터를 적용해 최대 메모리를 대상 시군 규모로 제한
+READ_CHUNKSIZE = 200_000
+
+# 거리 단위 투영(UTM52N)
+METRIC_CRS = "EPSG:32652"
+
+# 지점 스냅 방식: None이면 좌표 라운딩(소수 5자리, 약 1 m) + KNN 가중치,
+# "square"/"hex"면 투영 좌표 격자 셀(BIN_SIZE_M 간격)로 집계 + 격자 인접(정사각 8방향/육각 6방향) 가중치
+BIN_MODE = None
+BIN_SIZE_M = 100
+
 # Gi* / KNN
+GI_COLUMNS = ["AMT", "NOC"]   # 한 번의 순열로 함께 계산할 값 컬럼 (결과: <col 소문자>_z/_p/_label)
 K_NEIGHBORS = 8
 PERMUTATIONS = 999
 RANDOM_SEED = 1234
 
+# 함께 계산할 국지 통계량: "gi"(Gi*), "lisa"(국지적 Moran's I) — 같은 가중치·같은 순열 1회로 모두 계산
+LOCAL_STATS = ["gi", "lisa"]
+
+# 다중 스케일 k 스윕 (예: [4, 6, 8, 12, 16]) — None이면 K_NEIGHBORS 단일 실행 (BIN_MODE에서는 건너뜀)
+K_SWEEP = None
+
+# 조건부 순열 병렬화: 청크(순열 PERM_CHUNK개)마다 시드 파생 → 워커 수와 무관하게 동일한 p_sim
+WORKERS = os.cpu_count() or 1
+PERM_CHUNK = 100
+
+# 순차(Besag–Clifford) 조기 종료: 유의/비유의가 분명해진 지점은 순열을 그만 뽑음
+ADAPTIVE_PERMUTATIONS = False
+ALPHA = 0.05
+EARLY_STOP_CONFIDENCE = 0.999   # 유의 조기 판정용 Clopper–Pearson 신뢰수준 (None이면 비유의 쪽만 조기 종료)
+
+# 타일 실행 (경기도 전체 등 대용량): 타일마다 KNN·통계량·순열을 별도 프로세스로 (결과는 단일 그래프와 동일)
+# 타일 크기·halo는 hotspot_tiled.TILE_SIZE_M / TILE_HALO_M. KNN 모드 전용이며 k 스윕·증분 모드는 건너뜀
+TILED = False
+
+# 공간가중치 캐시 (좌표·k·커널·CRS·버전 해시별 .npz) — None이면 사용 안 함
+# 커널·동점 처리·저장 형식을 바꾸면 WEIGHTS_CACHE_VERSION을 올려 이전 캐시를 무효화.
+# 파일이 WEIGHTS_CACHE_MAX_FILES개를 넘으면 가장 오래 쓰지 않은 것부터 삭제 (LRU, 사용 시 mtime 갱신)
+WEIGHTS_CACHE_DIR = ".weights_cache"
+WEIGHTS_CACHE_VERSION = 1
+WEIGHTS_CACHE_MAX_FILES = 32
+
 # 출력 접두어
 OUT_PREFIX = "suwon_hotspots"
 
+# 증분 재계산: 직전 실행 상태(.npz)와 지점(스냅 좌표)별로 비교해, 새 지점·자기 값이 바뀐 지점·
+# 이웃 구성/가중치가 바뀐 지점·값이 바뀐 지점을 이웃으로 가진 지점만 순열 p-value 재계산, 나머지는 이월.
+# z-score·Moran's I·라벨은 항상 전체 재계산. (None이면 매번 전체 계산)
+# INCREMENTAL_FREEZE_NULL=True (근사): 조건부 순열은 이웃 값을 전체 y에서 뽑으므로, 값이 바뀌면 엄밀히는
+#   모든 지점의 귀무분포가 조금씩 바뀐다. 이월 지점은 그 지점을 마지막으로 검정한 실행의 y 분포를
+#   귀무분포로 고정해 쓴다 (재검정 지점은 전체 실행과 같은 값). 분기마다 일부 지점만 바뀌는 경우용.
+# INCREMENTAL_FREEZE_NULL=False (정확): 값·지점 구성이 그대로이고 가중치 그래프만 바뀐 경우에만 이월
+#   (이월 값이 전체 실행과 비트 단위로 같음), 그 외에는 전체 재계산.
+# 바뀐 지점 비율이 INCREMENTAL_MAX_CHANGED를 넘으면 전체 재계산 (근사 누적도 이때 초기화됨)
+INCREMENTAL_STATE = None   # 예: f"{OUT_PREFIX}_state.npz"
+INCREMENTAL_FREEZE_NULL = True
+INCREMENTAL_MAX_CHANGED = 0.3
+
 # 개별 GeoJSON도 추가로 저장할지
 SAVE_SEPARATE_GEOJSON = False
+
+# CSV/GeoJSON 옆에 함께 저장할 컬럼형 형식 (result_io: "parquet" = GeoParquet, "feather" = 비압축 Arrow)
+COLUMNAR_FORMATS = ["parquet", "feather"]
 # ========================
 
 
@@ -42,32 +107,116 @@ def extract_addr(s):
         return None
 
 
-def filter_suwon_address_first(df: pd.DataFrame) -> pd.DataFrame:
+# meta 문자열(dict repr) 정규식 경로 문법: 중첩 없는 단일 {...}, 키·값은 이스케이프 없는 문자열/정수·소수/None/True/False
+_STR = r"""(?:'[^'\\\r\n]*'|"[^"\\\r\n]*")"""
+_SCALAR = r"(?:" + _STR + r"|-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?|None|True|False)"
+_ITEM = _SCALAR + r"[ \t\n]*:[ \t\n]*" + _SCALAR
+_FLAT_DICT_RE = (r"[ \t]*\{[ \t\n]*(?:" + _ITEM + r"(?:[ \t\n]*,[ \t\n]*" + _ITEM + r")*"
+                 r"[ \t\n]*,?[ \t\n]*)?\}[ \t\n]*")
+_ADDR_KEY = r"""(?:'address_name'|"address_name")[ \t\n]*:"""
+# 최상위 키 위치(앞은 '{' 또는 항목 뒤 ',')의 'address_name' 문자열 값 (따옴표 포함)
+_ADDR_RE = (r"^[ \t]*\{[ \t\n]*(?:" + _ITEM + r"[ \t\n]*,[ \t\n]*)*" + _ADDR_KEY
+            + r"[ \t\n]*(?P<addr>" + _STR + r")")
+
+
+def extract_addr_column(meta: pd.Series) -> pd.Series:
+    """
+    meta 컬럼 전체에서 address_name을 벡터화 추출 (extract_addr와 같은 결과).
+    - 같은 meta 문자열은 한 번만 파싱 (factorize로 고유값만 처리 후 코드로 펼침)
+    - 정규식 경로: 스칼라 값만 있는 중첩 없는 단일 {...}(이스케이프 없음)이고
+      'address_name'이 정확히 1번, 최상위 키 위치에 문자열 값으로 있는 경우
+    - 그 외(중첩 dict, 따옴표 값 안의 키, 이스케이프, 형식 불량)는 ast.literal_eval 폴백
+    """
+    codes, uniques = pd.factorize(meta, use_na_sentinel=True)
+    u = pd.Series(np.asarray(uniques, dtype=object)).astype("string")
+
+    addr = u.str.extract(_ADDR_RE)["addr"].str[1:-1].astype(object)
+    fast = u.str.fullmatch(_FLAT_DICT_RE) & (u.str.count(_ADDR_KEY) == 1) & addr.notna()
+    slow = ~fast.fillna(False).to_numpy(dtype=bool)
+    addr = addr.where(~slow, None)
+    if slow.any():
+        addr[slow] = [extract_addr(x) for x in np.asarray(uniques, dtype=object)[slow]]
+
+    out = np.full(len(meta), None, dtype=object)
+    valid = codes >= 0
+    out[valid] = addr.to_numpy(dtype=object)[codes[valid]]
+    return pd.Series(out, index=meta.index, dtype=object)
+
+
+# 매출 CSV에서 읽는 컬럼 / 그중 숫자 컬럼
+SALES_COLUMNS = ["AMT", "NOC", "lat", "lon", "meta"]
+SALES_NUMERIC = ["AMT", "NOC", "lat", "lon"]
+
+
+def in_bbox(df: pd.DataFrame, bbox) -> pd.Series:
+    return ((df["lon"] >= bbox["min_lon"]) & (df["lon"] <= bbox["max_lon"]) &
+            (df["lat"] >= bbox["min_lat"]) & (df["lat"] <= bbox["max_lat"]))
+
+
+def read_sales_chunks(path: str, chunksize=READ_CHUNKSIZE):
     """
-    1순위: meta.address_name에 '수원시' 포함 행만 필터
-    실패(메타 없음/매칭 0건) 시: BBOX 폴백
+    골목상권 매출 CSV 청크 생성기 (load_sales_csv의 읽기 단계).
+    필요한 컬럼(AMT/NOC/lat/lon/meta)만 읽고 숫자 컬럼은 float64로 변환, 좌표 결측 행 제거.
     """
-    addr_filtered = None
-    if "meta" in df.columns:
-        df["addr_name"] = df["meta"].apply(extract_addr)
-        addr_filtered = df[df["addr_name"].str.contains("수원시", na=False)].copy()
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in SALES_COLUMNS if c in header]
+    num_cols = [c for c in SALES_NUMERIC if c in usecols]
+    for chunk in pd.read_csv(path, usecols=usecols, dtype={"meta": "object"},
+                             chunksize=chunksize):
+        for c in num_cols:
+            chunk[c] = pd.to_numeric(chunk[c], errors="coerce").astype("float64")
+        yield chunk.dropna(subset=["lat", "lon"])
 
-    if addr_filtered is not None and len(addr_filtered) > 0:
-        return addr_filtered
 
-    # 폴백: BBOX
-    print("⚠️ 주소 기반 필터 결과가 없어 BBOX로 필터합니다.")
-    return df[
-        (df["lon"] >= SUWON_BBOX["min_lon"]) & (df["lon"] <= SUWON_BBOX["max_lon"]) &
-        (df["lat"] >= SUWON_BBOX["min_lat"]) & (df["lat"] <= SUWON_BBOX["max_lat"])
-    ].copy()
+def filter_sales_chunks(chunks, sigun=SIGUN, bbox=SIGUN_BBOX) -> pd.DataFrame:
+    """
+    read_sales_chunks 청크 → 시군 필터 결과 (load_sales_csv의 필터 단계).
+    - 청크마다 meta.address_name에 sigun 포함 행만 남김 (addr_name 컬럼 추가, meta는 버림)
+    - 주소 매칭이 전체에서 0건이면 BBOX 폴백 (bbox=None이면 폴백 없음)
+    """
+    num_cols = list(SALES_NUMERIC)
+    addr_parts, bbox_parts = [], []
+    for chunk in chunks:
+        num_cols = [c for c in SALES_NUMERIC if c in chunk.columns]
+        if "meta" in chunk.columns:
+            addr = extract_addr_column(chunk["meta"])
+            hit = addr.str.contains(sigun, na=False, regex=False)
+            if hit.any():
+                addr_parts.append(chunk.loc[hit, num_cols].assign(addr_name=addr[hit]))
+        # 주소 매칭이 한 건이라도 나오면 BBOX 후보는 더 모으지 않음
+        if bbox is not None and not addr_parts:
+            bbox_parts.append(chunk.loc[in_bbox(chunk, bbox), num_cols])
+
+    if addr_parts:
+        return pd.concat(addr_parts, ignore_index=True)
+    if bbox is not None:
+        print("⚠️ 주소 기반 필터 결과가 없어 BBOX로 필터합니다.")
+        return pd.concat(bbox_parts, ignore_index=True) if bbox_parts \
+            else pd.DataFrame(columns=num_cols, dtype="float64")
+    return pd.DataFrame(columns=num_cols + ["addr_name"])
 
 
-def build_points_gdf(df: pd.DataFrame) -> gpd.GeoDataFrame:
+def load_sales_csv(path: str, sigun=SIGUN, bbox=SIGUN_BBOX,
+                   chunksize=READ_CHUNKSIZE) -> pd.DataFrame:
+    """
+    골목상권 매출 CSV 스트리밍 로드 + 시군 필터 (read_sales_chunks → filter_sales_chunks).
+    청크 단위로 읽자마자 필터하므로 전체 원본을 메모리에 올리지 않는다.
+    반환 컬럼: AMT, NOC, lat, lon[, addr_name]
+    """
+    return filter_sales_chunks(read_sales_chunks(path, chunksize), sigun=sigun, bbox=bbox)
+
+
+def build_points_gdf(df: pd.DataFrame, bin_mode=None, bin_size=BIN_SIZE_M,
+                     crs=METRIC_CRS) -> gpd.GeoDataFrame:
     """
     좌표 라운딩(소수 5자리)으로 같은 지점 묶고, 좌표별 AMT/NOC 합산.
     라운딩 좌표(lon_r, lat_r)를 대표 좌표로 사용.
+    bin_mode="square"/"hex"면 라운딩 대신 격자 셀 집계(bin_points_gdf)를 사용.
+    인덱스는 0..n-1의 point_id — 가중치 행렬 행/결과 컬럼이 모두 이 순서를 따른다.
     """
+    if bin_mode:
+        return bin_points_gdf(df, bin_mode, bin_size, crs)
+
     # 좌표 라운딩으로 지점 스냅
     df["lat_r"] = df["lat"].round(5)
     df["lon_r"] = df["lon"].round(5)
@@ -78,17 +227,261 @@ def build_points_gdf(df: pd.DataFrame) -> gpd.GeoDataFrame:
 
     gdf = gpd.GeoDataFrame(
         grouped.rename(columns={"lat_r": "lat", "lon_r": "lon"}),
-        geometry=[Point(xy) for xy in zip(grouped["lon_r"], grouped["lat_r"])],
+        geometry=gpd.points_from_xy(grouped["lon_r"], grouped["lat_r"]),
         crs="EPSG:4326"
     )
+    gdf.index.name = "point_id"
     return gdf
 
 
+# 격자 셀 이웃 (i, j) 오프셋: 정사각 = queen 8방향, 육각 = axial 좌표 6방향
+GRID_OFFSETS = {
+    "square": [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)],
+    "hex": [(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)],
+}
+
+
+def grid_cells(x: np.ndarray, y: np.ndarray, mode: str, size: float):
+    """
+    투영 좌표(m) → 정수 셀 좌표 (i, j). 원점 고정(0, 0)이라 실행 간 같은 셀 번호.
+    - square: 한 변 size
+    - hex: pointy-top 육각형, 인접 셀 중심 간격 size (axial q, r + cube 반올림)
+    """
+    if mode == "square":
+        return np.floor(x / size).astype(np.int64), np.floor(y / size).astype(np.int64)
+    if mode != "hex":
+        raise ValueError(f"지원하지 않는 격자: {mode} (square/hex)")
+    r_hex = size / np.sqrt(3)
+    qf = (np.sqrt(3) / 3 * x - y / 3) / r_hex
+    rf = (2 / 3 * y) / r_hex
+    sf = -qf - rf
+    q, r, s = np.round(qf), np.round(rf), np.round(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    q[fix_q] = -r[fix_q] - s[fix_q]
+    r[fix_r] = -q[fix_r] - s[fix_r]
+    return q.astype(np.int64), r.astype(np.int64)
+
+
+def grid_centers(i: np.ndarray, j: np.ndarray, mode: str, size: float):
+    """정수 셀 좌표 → 셀 중심 투영 좌표 (x, y)."""
+    if mode == "square":
+        return (i + 0.5) * size, (j + 0.5) * size
+    r_hex = size / np.sqrt(3)
+    return r_hex * np.sqrt(3) * (i + j / 2), r_hex * 1.5 * j
+
+
+def _cell_keys(i, j, i0, j0, width):
+    return (i - i0) * width + (j - j0)
+
+
+def bin_points_gdf(df: pd.DataFrame, mode: str, size: float, crs=METRIC_CRS,
+                   value_cols=("AMT", "NOC")) -> gpd.GeoDataFrame:
+    """
+    격자(정사각/육각) 셀 단위 집계.
+    - 셀 번호는 투영 좌표의 산술 연산(floor / axial 반올림)으로 계산
+    - 셀별 합계는 np.bincount (groupby 없음), n_points = 셀에 들어간 원본 행 수
+    - 대표 좌표 = 셀 중심 (lat/lon), cell_i/cell_j = 정수 셀 좌표 (grid_weights 입력)
+    """
+    tf = Transformer.from_crs("EPSG:4326", crs, always_xy=True)
+    x, y = tf.transform(df["lon"].to_numpy(), df["lat"].to_numpy())
+    i, j = grid_cells(np.asarray(x), np.asarray(y), mode, size)
+
+    i0, j0 = i.min(), j.min()
+    width = j.max() - j0 + 1
+    keys, first, inv = np.unique(_cell_keys(i, j, i0, j0, width),
+                                 return_index=True, return_inverse=True)
+    ci, cj = i[first], j[first]
+    cx, cy = grid_centers(ci, cj, mode, size)
+    lon, lat = tf.transform(cx, cy, direction="INVERSE")
+
+    out = pd.DataFrame({"lat": lat, "lon": lon})
+    for c in value_cols:
+        v = np.nan_to_num(df[c].to_numpy("float64"))
+        out[c] = np.bincount(inv, weights=v, minlength=len(keys))
+    out["n_points"] = np.bincount(inv, minlength=len(keys))
+    out["cell_i"], out["cell_j"] = ci, cj
+
+    gdf = gpd.GeoDataFrame(out, geometry=gpd.points_from_xy(lon, lat), crs="EPSG:4326")
+    gdf.index.name = "point_id"
+    return gdf
+
+
+def grid_weights(gdf: pd.DataFrame, mode: str, row_standardize=True) -> WSP:
+    """
+    점유 셀 사이의 암묵적 격자 인접 가중치 (이진, 기본 행표준화).
+    이웃 탐색 없이 셀 좌표 오프셋 + 정렬된 셀 번호 searchsorted로 CSR 생성.
+    이웃 셀이 하나도 없는 셀은 빈 행 (Gi*에서는 자기 자신만 남음).
+    """
+    i, j = gdf["cell_i"].to_numpy(np.int64), gdf["cell_j"].to_numpy(np.int64)
+    n = len(i)
+    i0, j0 = i.min() - 1, j.min() - 1
+    width = j.max() - j0 + 2
+    keys = _cell_keys(i, j, i0, j0, width)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    rows, cols = [], []
+    for di, dj in GRID_OFFSETS[mode]:
+        nk = _cell_keys(i + di, j + dj, i0, j0, width)
+        pos = np.minimum(np.searchsorted(sorted_keys, nk), n - 1)
+        hit = sorted_keys[pos] == nk
+        rows.append(np.flatnonzero(hit))
+        cols.append(order[pos[hit]])
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+
+    w = np.ones(len(rows))
+    if row_standardize:
+        w /= np.bincount(rows, minlength=n)[rows]
+    csr = sparse.csr_matrix((w, (rows, cols)), shape=(n, n))
+    csr.sort_indices()
+    return WSP(csr)
+
+
+def add_metric_xy(gdf: pd.DataFrame, crs=METRIC_CRS) -> pd.DataFrame:
+    """
+    WGS84 lon/lat 컬럼을 투영 좌표 x/y(m) 컬럼으로 같은 프레임에 추가.
+    지오메트리는 WGS84 그대로 두므로 결과 프레임을 다시 재투영할 필요가 없다.
+    """
+    tf = Transformer.from_crs("EPSG:4326", crs, always_xy=True)
+    gdf["x"], gdf["y"] = tf.transform(gdf["lon"].to_numpy(), gdf["lat"].to_numpy())
+    return gdf
+
+
+def knn_query(coords: np.ndarray, k=8):
+    """
+    KD-tree 1회 배치 질의로 (n, k) 이웃 인덱스/거리 배열 생성.
+    - 자기 자신은 제외, 각 행은 거리 오름차순
+    - 중복 좌표로 자기 자신이 0번 열에 오지 않는 경우도 처리
+    """
+    n = len(coords)
+    if n <= k:
+        raise ValueError(f"지점 수({n})가 k({k})보다 커야 합니다.")
+
+    dist, idx = cKDTree(coords).query(coords, k=k + 1, workers=-1)
+
+    # 자기 자신을 맨 뒤로 보내고(안정 정렬) 앞의 k개만 사용
+    is_self = idx == np.arange(n)[:, None]
+    order = np.argsort(is_self, axis=1, kind="stable")[:, :k]
+    idx = np.take_along_axis(idx, order, axis=1)
+    dist = np.take_along_axis(dist, order, axis=1)
+    return idx, dist
+
+
+def bisquare_weights(dist: np.ndarray) -> np.ndarray:
+    """
+    (n, k) 이웃 거리 → 적응형 bi-square 가중치 (n, k).
+    h_i = 각 행의 k번째(최대) 거리, h_i == 0 이면 가중치 1.
+    """
+    h = dist[:, -1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = (1 - (dist / h) ** 2) ** 2
+    return np.where(h > 0, w, 1.0)
+
+
+def kernel_weights(dist: np.ndarray, row_standardize=True) -> np.ndarray:
+    """(n, k) 거리 → bi-square 가중치 (옵션: 행표준화)."""
+    w = bisquare_weights(dist)
+    if row_standardize:
+        rs = w.sum(axis=1, keepdims=True)
+        w = np.divide(w, rs, out=np.zeros_like(w), where=rs > 0)
+    return w
+
+
+def neighbor_arrays_to_csr(idx: np.ndarray, w: np.ndarray) -> sparse.csr_matrix:
+    """(n, k) 이웃 인덱스/가중치 배열을 (n, n) CSR 행렬로 변환 (0 가중치 제거)."""
+    n, k = idx.shape
+    indptr = np.arange(0, n * k + 1, k)
+    csr = sparse.csr_matrix((w.ravel(), idx.ravel(), indptr), shape=(n, n))
+    csr.sort_indices()
+    csr.eliminate_zeros()
+    return csr
+
+
+def weights_cache_key(coords: np.ndarray, k: int, kernel: str, crs,
+                      version=WEIGHTS_CACHE_VERSION) -> str:
+    """스냅 좌표 바이트 + k + 커널 종류 + CRS + 캐시 버전 해시 (캐시 파일명용)."""
+    h = hashlib.sha1(np.ascontiguousarray(coords, dtype="float64").tobytes())
+    h.update(f"|k={k}|kernel={kernel}|crs={crs}|v={version}".encode("utf-8"))
+    return h.hexdigest()[:20]
+
+
+def load_weights_cache(path: str):
+    """캐시 .npz → (idx, dist, w) 또는 None. 읽으면 mtime을 갱신 (LRU 정리 기준)."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        out = z["idx"], z["dist"], z["w"]
+    os.utime(path)
+    return out
+
+
+def prune_weights_cache(cache_dir: str, max_files=WEIGHTS_CACHE_MAX_FILES):
+    """캐시 파일이 max_files개를 넘으면 mtime이 오래된 것부터 삭제 (None이면 정리 안 함)."""
+    if max_files is None or not os.path.isdir(cache_dir):
+        return
+    files = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir)
+             if f.startswith("w_") and f.endswith(".npz") and ".tmp." not in f]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for f in files[max_files:]:
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
+
+def save_weights_cache(path: str, idx: np.ndarray, dist: np.ndarray, w: np.ndarray):
+    cache_dir = os.path.dirname(path) or "."
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, idx=idx.astype(np.int64), dist=dist, w=w)
+    os.replace(tmp, path)
+    prune_weights_cache(cache_dir)
+
+
+def knn_bisquare_sparse(gdf_metric_crs: gpd.GeoDataFrame, k=8, row_standardize=True,
+                        cache_dir=None) -> WSP:
+    """
+    knn_bisquare_adaptive의 벡터화 버전.
+    KD-tree 질의 1회 + (n, k) 배열 연산으로 가중치를 만들고 CSR(WSP)로 바로 반환.
+    cache_dir 지정 시 같은 좌표·k·커널·CRS·캐시 버전 조합은 이웃 탐색 없이 캐시에서 로드.
+    """
+    coords = np.column_stack([gdf_metric_crs.geometry.x.values,
+                              gdf_metric_crs.geometry.y.values])
+    return knn_bisquare_coords(coords, k=k, row_standardize=row_standardize,
+                               cache_dir=cache_dir, crs=gdf_metric_crs.crs)
+
+
+def knn_bisquare_coords(coords: np.ndarray, k=8, row_standardize=True,
+                        cache_dir=None, crs=METRIC_CRS) -> WSP:
+    """투영 좌표 배열 (n, 2)에서 바로 적응형 bi-square 가중치(WSP) 생성."""
+    kernel = "bisquare_r" if row_standardize else "bisquare"
+
+    path = None
+    if cache_dir:
+        key = weights_cache_key(coords, k, kernel, crs)
+        path = os.path.join(cache_dir, f"w_{key}.npz")
+        cached = load_weights_cache(path)
+        if cached is not None:
+            print(f"가중치 캐시 사용: {path}")
+            idx, _, w = cached
+            return WSP(neighbor_arrays_to_csr(idx, w))
+
+    idx, dist = knn_query(coords, k=k)
+    w = kernel_weights(dist, row_standardize)
+
+    if path:
+        save_weights_cache(path, idx, dist, w)
+    return WSP(neighbor_arrays_to_csr(idx, w))
+
+
 def knn_bisquare_adaptive(gdf_metric_crs: gpd.GeoDataFrame, k=8, row_standardize=True) -> W:
     """
     - k-최근접 이웃 집합
     - 각 점 i의 k번째 이웃 거리 = 대역폭 h_i
     - bi-square: w_ij = (1 - (d_ij / h_i)^2)^2 (d_ij<=h_i, else 0)
+    (노드별 파이썬 루프 버전 — 대규모 입력은 knn_bisquare_sparse 사용)
     """
     w_knn = KNN.from_dataframe(gdf_metric_crs, k=k)
 
@@ -117,88 +510,655 @@ def knn_bisquare_adaptive(gdf_metric_crs: gpd.GeoDataFrame, k=8, row_standardize
     return w_kernel
 
 
-def run_gi(gdf_in: gpd.GeoDataFrame, value_col: str, w: W, prefix: str,
-           permutations=999, seed=1234) -> gpd.GeoDataFrame:
-    y = pd.to_numeric(gdf_in[value_col], errors="coerce").fillna(0)\
+# ========= 조건부 순열(conditional randomization) 엔진 =========
+# 각 청크는 (seed, 청크 번호)로부터 독립 난수열을 만들고, 행 블록 경계도 고정값이라
+# 어떤 워커가 어떤 청크를 처리하든 결과(정수 카운트 합)는 비트 단위로 같다.
+ROW_BLOCK = 2048
+
+_CRAND_STATE = {}
+
+
+def gi_star_weights(w, star=0.5) -> sparse.csr_matrix:
+    """
+    esda G_Local(star=0.5)와 같은 방식으로 자기 가중치를 채운 뒤 행표준화한 CSR.
+    w: WSP 또는 (transform이 적용된) libpysal W
+    """
+    csr = sparse.csr_matrix(w.sparse, dtype="float64", copy=True)
+    csr.setdiag(star)
+    rs = np.asarray(csr.sum(axis=1)).ravel()
+    inv = np.divide(1.0, rs, out=np.zeros_like(rs), where=rs > 0)
+    return sparse.csr_matrix(sparse.diags(inv) @ csr)
+
+
+def split_self_weights(csr: sparse.csr_matrix, width=None):
+    """
+    CSR → (자기 가중치 (n,), 이웃 가중치 (n, k_max)) 패딩 배열.
+    순열에서 자기 자신은 고정, 나머지 이웃 자리만 무작위 값으로 채운다.
+    width: 패딩 폭(= 순열 인덱스 열 수) 지정 — 타일 실행에서 전체 그래프와 같은 순열을 쓰기 위함
+    """
+    n = csr.shape[0]
+    w_self = csr.diagonal().copy()
+    other = sparse.csr_matrix(csr - sparse.diags(w_self))
+    other.eliminate_zeros()
+
+    counts = np.diff(other.indptr)
+    k_max = max(int(counts.max()) if n else 0, 1) if width is None else width
+    rows = np.repeat(np.arange(n), counts)
+    cols = np.arange(other.nnz) - np.repeat(other.indptr[:-1], counts)
+    w_other = np.zeros((n, k_max))
+    w_other[rows, cols] = other.data
+    return w_self, w_other
+
+
+def global_moments(y: np.ndarray) -> dict:
+    """
+    국지 통계량이 쓰는 전역 요약값. 타일 실행에서는 전체 y로 한 번 계산해 모든 타일에 넘긴다
+    (각 함수가 moments=None일 때 직접 계산하는 식과 같으므로 결과도 비트 단위로 같다).
+    """
+    mean, sd = y.mean(axis=0), y.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (y - mean) / sd
+    return dict(n=len(y), y_sum=y.sum(axis=0), sq_sum=(y ** 2).sum(axis=0),
+                mean=mean, sd=sd, den=(z * z).sum(axis=0))
+
+
+def gi_star_z(y: np.ndarray, csr: sparse.csr_matrix, moments=None):
+    """
+    G* 관측값과 정규근사 z-score (esda G_Local.calc, star 경우와 동일한 식).
+    y: (n,) 또는 (n, m) — 여러 컬럼을 한 번의 희소 곱으로 계산
+    moments: global_moments 결과 (타일처럼 y가 전체 일부일 때), None이면 y에서 계산
+    """
+    mo = global_moments(y) if moments is None else moments
+    n = mo["n"]
+    y_sum = mo["y_sum"]
+    g = (csr @ y) / y_sum
+
+    mean = y_sum / n
+    var = mo["sq_sum"] / n - mean ** 2
+    card = np.asarray(csr.sum(axis=1)).ravel()
+    if y.ndim == 2:
+        card = card[:, None]
+    eg = card / n
+    vg = card * (n - card) / (n - 1) / n ** 2 * var / mean ** 2
+    return g, (g - eg) / np.sqrt(vg)
+
+
+def gi_star_terms(y: np.ndarray, w, star=0.5, moments=None):
+    """
+    Gi*를 이웃 가중합 lag_i = Σ_j w_ij y_j (기본 가중치, 자기 제외)의 일차식으로 표현.
+    G*_i = a_i * lag_i + b_i  (a_i = 1/((r_i+star)·Σy), b_i = star·y_i/((r_i+star)·Σy), r_i = 행 합)
+    y: (n, m) → 반환: (관측 G*, z-score, a, b) 각 (n, m)
+    """
+    mo = global_moments(y) if moments is None else moments
+    g, z = gi_star_z(y, gi_star_weights(w, star), mo)
+    rs = np.asarray(w.sparse.sum(axis=1)).ravel()
+    inv = (1.0 / (rs + star))[:, None] / mo["y_sum"]
+    return g, z, np.broadcast_to(inv, y.shape), star * inv * y
+
+
+def local_moran_terms(y: np.ndarray, w, moments=None):
+    """
+    국지적 Moran's I (esda Moran_Local, transformation="r"과 같은 식).
+    I_i = (n-1) · z_i · Σ_j w_ij z_j / Σ z²,  z = (y - 평균) / 표준편차
+    z가 y의 일차변환이라 Gi*와 같은 lag_i = Σ_j w_ij y_j 로 I_i = a_i * lag_i + b_i 가 된다.
+    y: (n, m) → 반환: (관측 I, a, b, z, 표준화 공간시차 Σ_j w_ij z_j) 각 (n, m)
+    """
+    mo = global_moments(y) if moments is None else moments
+    n, mean, sd, den = mo["n"], mo["mean"], mo["sd"], mo["den"]
+    csr = sparse.csr_matrix(w.sparse, dtype="float64")
+    z = (y - mean) / sd
+    zlag = csr @ z
+    moran_i = (n - 1) * z * zlag / den
+
+    rs = np.asarray(csr.sum(axis=1)).ravel()[:, None]
+    a = (n - 1) * z / (den * sd)
+    return moran_i, a, -a * mean * rs, z, zlag
+
+
+def bivariate_moran_terms(x: np.ndarray, y: np.ndarray, w, moments_x=None, moments_y=None):
+    """
+    이변량 국지 Moran's I (esda Moran_Local_BV, transformation="r"과 같은 식).
+    I_i = (n-1) · zx_i · Σ_j w_ij zy_j / Σ zx²  — 지점 i의 x와 이웃의 y
+    순열은 y만 섞으므로 lag_i = Σ_j w_ij y_j 의 일차식 I_i = a_i * lag_i + b_i.
+    x, y: (n, m) → 반환: (관측 I, a, b, zx, y의 표준화 공간시차 Σ_j w_ij zy_j) 각 (n, m)
+    """
+    mx = global_moments(x) if moments_x is None else moments_x
+    my = global_moments(y) if moments_y is None else moments_y
+    n, den = mx["n"], mx["den"]
+    csr = sparse.csr_matrix(w.sparse, dtype="float64")
+    zx = (x - mx["mean"]) / mx["sd"]
+    zlag = csr @ ((y - my["mean"]) / my["sd"])
+    moran_i = (n - 1) * zx * zlag / den
+
+    rs = np.asarray(csr.sum(axis=1)).ravel()[:, None]
+    a = (n - 1) * zx / (den * my["sd"])
+    return moran_i, a, -a * my["mean"] * rs, zx, zlag
+
+
+def perm_ids(seed: int, chunk: int, size: int, n: int, k: int) -> np.ndarray:
+    """청크별 순열 인덱스 (size, k): 자기 자신을 뺀 n-1개 중 비복원 추출."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+    return np.stack([rng.choice(n - 1, size=k, replace=False) for _ in range(size)])
+
+
+def chunk_sizes(permutations: int, chunk=PERM_CHUNK):
+    n_chunks = -(-permutations // chunk)
+    return [min(chunk, permutations - c * chunk) for c in range(n_chunks)]
+
+
+def _crand_init(state):
+    _CRAND_STATE.clear()
+    _CRAND_STATE.update(state)
+
+
+def _crand_chunk(chunk: int, rows=None) -> np.ndarray:
+    """
+    청크 하나의 순열로 각 지점·통계량 컬럼의 '관측값 이상' 횟수 (len(rows), M)를 센다.
+    순열 이웃 값의 가중합 lag (값 컬럼 m개)는 한 번만 모으고,
+    통계량 컬럼 c마다 rstat = a[:, c] * lag[..., col[c]] + b[:, c] 로 비교한다.
+    rows=None 이면 전체 지점.
+    """
+    st = _CRAND_STATE
+    y, w_other, obs = st["y"], st["w_other"], st["obs"]
+    a, b, col, gid = st["a"], st["b"], st["col"], st["gid"]
+    n, k = len(y), w_other.shape[1]
+    ids = perm_ids(st["seed"], chunk, st["sizes"][chunk], n, k)
+    if rows is None:
+        rows = np.arange(len(w_other))
+
+    larger = np.zeros((len(rows), obs.shape[1]), dtype=np.int64)
+    for s in range(0, len(rows), ROW_BLOCK):
+        block = slice(s, s + ROW_BLOCK)
+        rows_b = rows[block]
+        lag = np.zeros((len(rows_b), len(ids), y.shape[1]))
+        for j in range(k):
+            # 자기 자신을 뺀 인덱스 → 원래 인덱스 (id >= i 이면 +1)
+            m = ids[None, :, j] + (ids[None, :, j] >= gid[rows_b, None])
+            lag += y[m] * w_other[rows_b, j][:, None, None]
+        rstat = lag[:, :, col] * a[rows_b, None, :] + b[rows_b, None, :]
+        larger[block] = (rstat >= obs[rows_b, None, :]).sum(axis=1)
+    return larger
+
+
+def _crand_pool(state, workers: int, n_chunks: int):
+    """workers <= 1 이면 현재 프로세스에서 실행 (None 반환), 아니면 프로세스 풀."""
+    if workers <= 1 or n_chunks == 1:
+        _crand_init(state)
+        return nullcontext(None)
+    return ProcessPoolExecutor(max_workers=min(workers, n_chunks),
+                               initializer=_crand_init, initargs=(state,))
+
+
+def _run_chunks(ex, chunks, rows=None):
+    if ex is None:
+        return [_crand_chunk(c, rows) for c in chunks]
+    return list(ex.map(_crand_chunk, chunks, [rows] * len(chunks)))
+
+
+def _crand_state(y, w_other, obs, a, b, col, permutations, seed, gid=None):
+    n, r = len(y), len(w_other)
+    y = y.reshape(n, -1)
+    obs = obs.reshape(r, -1)
+    if col is None:
+        col = np.arange(obs.shape[1]) % y.shape[1]
+    return dict(y=y, w_other=w_other, obs=obs,
+                a=np.broadcast_to(np.reshape(a, (r, -1)), obs.shape),
+                b=np.broadcast_to(np.reshape(b, (r, -1)), obs.shape),
+                col=np.asarray(col), gid=np.arange(r) if gid is None else np.asarray(gid),
+                seed=seed, sizes=chunk_sizes(permutations))
+
+
+def crand_p_sim(y, w_other, obs, a, b, col=None, permutations=999, seed=1234, workers=1,
+                rows=None, gid=None):
+    """
+    조건부 순열 pseudo p-value (esda의 'directed' 방식: 더 작은 꼬리 기준).
+    통계량은 순열 lag = Σ_k w_other[i, k] · y[무작위 이웃]의 일차식 a * lag + b 형태.
+    workers > 1 이면 청크를 프로세스 풀에 분배. 결과는 workers와 무관하게 동일.
+    y: (n,) 또는 (n, m) 순열할 값, obs/a/b: (n,) 또는 (n, M) 통계량 컬럼,
+    col: 통계량 컬럼별 y 컬럼 번호 (기본: c % m)
+    rows: 지정 시 해당 지점만 계산해 (len(rows), ...) 반환 (전체 실행의 같은 행과 동일한 값)
+    gid: w_other/obs/a/b 행이 y의 일부 지점일 때 각 행의 y 내 번호 (타일 실행용, 기본 0..n-1)
+    """
+    state = _crand_state(y, w_other, obs, a, b, col, permutations, seed, gid)
+    chunks = range(len(state["sizes"]))
+    with _crand_pool(state, workers, len(chunks)) as ex:
+        counts = _run_chunks(ex, chunks, rows)
+
+    larger = np.sum(counts, axis=0)
+    below = (permutations - larger) < larger
+    larger[below] = permutations - larger[below]
+    shape = obs.shape if rows is None else (len(rows),) + obs.shape[1:]
+    return ((larger + 1) / (permutations + 1)).reshape(shape)
+
+
+def crand_sequential(y, w_other, obs, a, b, col=None, permutations=999, seed=1234,
+                     workers=1, alpha=0.05, confidence=0.999, rows=None, gid=None):
+    """
+    Besag–Clifford 순차 몬테카를로 검정 (지점별 조기 종료).
+    - 비유의 확정: 작은 꼬리 횟수 s가 h = floor(alpha*(B+1))에 도달하면
+      남은 순열과 무관하게 최종 p > alpha 이므로 중단 (전체 실행과 라벨 동일)
+    - 유의 확정: s/l의 Clopper–Pearson 상한(confidence)이 alpha 미만이면 중단
+      (confidence=None 이면 사용 안 함)
+    - 나머지(경계 지점)만 B개 전부 사용
+    청크 순서대로 판정하므로 결과는 workers와 무관하게 동일. 인자는 crand_p_sim과 같다.
+    반환: (p_sim, n_perm) — p_sim = (s+1)/(l+1), n_perm = 지점별 사용한 순열 수 l
+    """
+    state = _crand_state(y, w_other, obs, a, b, col, permutations, seed, gid)
+    sizes = state["sizes"]
+    shape = state["obs"].shape
+    h = int(np.floor(alpha * (permutations + 1)))
+
+    larger = np.zeros(shape, dtype=np.int64)
+    drawn = np.zeros(shape, dtype=np.int64)
+    active = np.zeros(shape, dtype=bool)
+    active[slice(None) if rows is None else rows] = True
+    step = max(workers, 1)
+
+    with _crand_pool(state, workers, len(sizes)) as ex:
+        for c0 in range(0, len(sizes), step):
+            live = np.flatnonzero(active.any(axis=1))
+            if len(live) == 0:
+                break
+            chunks = range(c0, min(c0 + step, len(sizes)))
+            for c, cnt in zip(chunks, _run_chunks(ex, chunks, live)):
+                act = active[live]
+                larger[live] += np.where(act, cnt, 0)
+                drawn[live] += np.where(act, sizes[c], 0)
+
+                l, s = drawn[live], np.minimum(larger[live], drawn[live] - larger[live])
+                done = s >= h
+                if confidence is not None:
+                    upper = beta.ppf(confidence, s + 1, np.maximum(l - s, 1))
+                    done |= upper < alpha
+                active[live] = act & ~done
+
+    s = np.minimum(larger, drawn - larger)
+    p_sim = (s + 1) / (drawn + 1)
+    if rows is not None:
+        p_sim, drawn = p_sim[rows], drawn[rows]
+    shape = obs.shape if rows is None else (len(rows),) + obs.shape[1:]
+    return p_sim.reshape(shape), drawn.reshape(shape)
+
+
+def label_gi(z: np.ndarray, p: np.ndarray, alpha=ALPHA) -> np.ndarray:
+    return np.where((z > 0) & (p <= alpha), "Hotspot",
+                    np.where((z < 0) & (p <= alpha), "Coldspot", "Not significant"))
+
+
+def label_lisa(z: np.ndarray, zlag: np.ndarray, p: np.ndarray, alpha=ALPHA) -> np.ndarray:
+    """LISA 사분면 라벨 (esda Moran_Local.q와 같은 구분: z > 0 이면 High, 아니면 Low)."""
+    quad = np.where(z > 0, np.where(zlag > 0, "High-High", "High-Low"),
+                    np.where(zlag > 0, "Low-High", "Low-Low"))
+    return np.where(p <= alpha, quad, "Not significant")
+
+
+# 통계량별 결과 컬럼 접미어: (값, p-value, 라벨), 순차 검정 시 사용 순열 수
+STAT_SUFFIXES = {"gi": ("z", "p", "label"), "lisa": ("lisa_i", "lisa_p", "lisa_label")}
+NPERM_SUFFIXES = {"gi": "nperm", "lisa": "lisa_nperm"}
+
+
+def permutation_columns(value_cols, stats, adaptive=False, prefixes=None) -> list:
+    """순열로만 얻는(재계산 비용이 큰) 결과 컬럼: p-value (+ adaptive면 사용 순열 수)."""
+    prefixes = [c.lower() for c in value_cols] if prefixes is None else list(prefixes)
+    cols = [f"{p}_{STAT_SUFFIXES[s][1]}" for s in stats for p in prefixes]
+    if adaptive:
+        cols += [f"{p}_{NPERM_SUFFIXES[s]}" for s in stats for p in prefixes]
+    return cols
+
+
+def local_stat_terms(y: np.ndarray, w, stats, moments=None):
+    """
+    통계량별 관측값·일차식 계수를 (n, len(stats)·m)로 이어 붙인 (obs, a, b)와
+    결과 컬럼용 배열 dict(z / moran_i, z_lisa, zlag)를 반환.
+    """
+    terms, parts = {}, {}
+    if "gi" in stats:
+        g, parts["z"], a, b = gi_star_terms(y, w, moments=moments)
+        terms["gi"] = (g, a, b)
+    if "lisa" in stats:
+        moran_i, a, b, parts["z_lisa"], parts["zlag"] = local_moran_terms(y, w, moments)
+        parts["moran_i"] = moran_i
+        terms["lisa"] = (moran_i, a, b)
+    obs, a, b = (np.hstack([terms[s][t] for s in stats]) for t in range(3))
+    return obs, a, b, parts
+
+
+def write_local_stats(frame: pd.DataFrame, stats, prefixes, parts: dict, p_sim, n_perm=None):
+    """local_stat_terms 결과 + p-value를 STAT_SUFFIXES 이름의 컬럼으로 frame에 기록."""
+    m = len(prefixes)
+    for s, stat in enumerate(stats):
+        val_sfx, p_sfx, label_sfx = STAT_SUFFIXES[stat]
+        for j, prefix in enumerate(prefixes):
+            c = s * m + j
+            if stat == "gi":
+                value, label = parts["z"][:, j], label_gi(parts["z"][:, j], p_sim[:, c])
+            else:
+                value = parts["moran_i"][:, j]
+                label = label_lisa(parts["z_lisa"][:, j], parts["zlag"][:, j], p_sim[:, c])
+            frame[f"{prefix}_{val_sfx}"] = value
+            frame[f"{prefix}_{p_sfx}"] = p_sim[:, c]
+            frame[f"{prefix}_{label_sfx}"] = label
+            if n_perm is not None:
+                frame[f"{prefix}_{NPERM_SUFFIXES[stat]}"] = n_perm[:, c]
+    return frame
+
+
+def assign_local_stats(frame: pd.DataFrame, value_cols, w, stats=("gi", "lisa"),
+                       prefixes=None, permutations=999, seed=1234, workers=1,
+                       adaptive=False, rows=None, carry=None) -> pd.DataFrame:
+    """
+    Gi*와 국지적 Moran's I(LISA)를 같은 가중치·같은 순열로 한 번에 계산해 frame에 컬럼 추가.
+    - 두 통계량 모두 lag_i = Σ_j w_ij y_j 의 일차식이라, 순열마다 이웃 값을 모으는 작업
+      (비용의 대부분)은 한 번만 하고 통계량별 비교만 추가된다
+    - 순열 인덱스는 모든 값 컬럼·통계량이 공유
+    - adaptive=True: 순차 조기 종료 검정, 지점별 사용 순열 수를 *_nperm에 기록
+    stats: "gi" → <prefix>_z / _p / _label (_nperm)
+           "lisa" → <prefix>_lisa_i / _lisa_p / _lisa_label (_lisa_nperm)
+                    라벨: High-High / Low-Low / High-Low / Low-High / Not significant
+    prefix 기본값은 컬럼명 소문자. frame의 행 순서 = 가중치 행렬의 행 순서여야 한다.
+    증분 모드: rows(지점 번호 배열)만 순열 검정을 다시 하고, 나머지 지점의
+    p-value(·사용 순열 수)는 carry(permutation_columns 컬럼을 가진, frame과 같은 행 순서의 표)에서
+    가져온다. 순열 이웃 값은 전체 y에서 뽑으므로, y가 carry를 만든 실행과 다르면 이월 값은
+    직전 귀무분포를 고정한 근사다 (incremental_rows 참고). z-score·Moran's I·라벨은 항상 전체 지점을
+    다시 계산(희소 곱 1회).
+    """
+    value_cols = list(value_cols)
+    prefixes = [c.lower() for c in value_cols] if prefixes is None else list(prefixes)
+    stats = list(stats)
+    y = frame[value_cols].apply(pd.to_numeric, errors="coerce").fillna(0)\
         .astype("float64").values
-    g = G_Local(y, w, star=0.5, permutations=permutations, seed=seed)
-    out = gdf_in.copy()
-    out[f"{prefix}_z"] = g.Zs
-    out[f"{prefix}_p"] = g.p_sim
-    out[f"{prefix}_label"] = [
-        "Hotspot" if (z > 0 and p <= 0.05) else
-        "Coldspot" if (z < 0 and p <= 0.05) else
-        "Not significant"
-        for z, p in zip(g.Zs, g.p_sim)
-    ]
-    return out
+
+    obs, a, b, parts = local_stat_terms(y, w, stats)
+    _, w_other = split_self_weights(sparse.csr_matrix(w.sparse, dtype="float64"))
+    if adaptive:
+        p_new, n_new = crand_sequential(
+            y, w_other, obs, a, b, permutations=permutations, seed=seed,
+            workers=workers, alpha=ALPHA, confidence=EARLY_STOP_CONFIDENCE, rows=rows)
+    else:
+        p_new = crand_p_sim(y, w_other, obs, a, b, permutations=permutations,
+                            seed=seed, workers=workers, rows=rows)
+
+    n_perm = None
+    if rows is None:
+        p_sim = p_new
+        if adaptive:
+            n_perm = n_new
+    else:
+        carried = carry[permutation_columns(value_cols, stats, adaptive, prefixes)].to_numpy()
+        p_sim = carried[:, :obs.shape[1]].astype("float64")
+        p_sim[rows] = p_new
+        if adaptive:
+            n_perm = carried[:, obs.shape[1]:].astype(np.int64)
+            n_perm[rows] = n_new
+    # 이웃이 없는 지점(격자 고립 셀 등)은 순열 분포가 관측값 한 점뿐이라 검정 불가 → p = NaN
+    p_sim[~(w_other > 0).any(axis=1)] = np.nan
+    return write_local_stats(frame, stats, prefixes, parts, p_sim, n_perm)
+
+
+def assign_gi(frame: pd.DataFrame, value_cols, w, prefixes=None,
+              permutations=999, seed=1234, workers=1, adaptive=False) -> pd.DataFrame:
+    """
+    여러 값 컬럼의 Gi*만 계산해 frame에 컬럼으로 바로 추가 (복사·병합 없음).
+    결과 컬럼: <prefix>_z / <prefix>_p / <prefix>_label (adaptive면 <prefix>_nperm)
+    """
+    return assign_local_stats(frame, value_cols, w, stats=("gi",), prefixes=prefixes,
+                              permutations=permutations, seed=seed, workers=workers,
+                              adaptive=adaptive)
+
+
+def run_gi_multi(gdf_in: gpd.GeoDataFrame, value_cols, w, prefixes=None,
+                 permutations=999, seed=1234, workers=1, adaptive=False) -> gpd.GeoDataFrame:
+    """assign_gi의 복사본 반환 버전 (입력 프레임은 그대로 둠)."""
+    return assign_gi(gdf_in.copy(), value_cols, w, prefixes, permutations=permutations,
+                     seed=seed, workers=workers, adaptive=adaptive)
+
+
+def run_gi(gdf_in: gpd.GeoDataFrame, value_col: str, w, prefix: str,
+           permutations=999, seed=1234, workers=1, adaptive=False) -> gpd.GeoDataFrame:
+    return run_gi_multi(gdf_in, [value_col], w, [prefix], permutations=permutations,
+                        seed=seed, workers=workers, adaptive=adaptive)
+
+
+def save_run_state(path: str, frame: pd.DataFrame, value_cols, w, result_cols, settings: dict):
+    """
+    증분 재계산용 실행 상태 저장: 스냅 좌표(lat/lon), 값, 가중치(CSR), 순열 결과 컬럼, 설정.
+    """
+    csr = sparse.csr_matrix(w.sparse, dtype="float64")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, lat=frame["lat"].to_numpy("float64"), lon=frame["lon"].to_numpy("float64"),
+             y=frame[list(value_cols)].to_numpy("float64"),
+             w_indptr=csr.indptr, w_indices=csr.indices, w_data=csr.data,
+             result_cols=np.asarray(result_cols, dtype=str),
+             results=frame[list(result_cols)].to_numpy("float64"),
+             settings=np.asarray(repr(sorted(settings.items()))))
+    os.replace(tmp, path)
+
+
+def load_run_state(path: str, settings: dict):
+    """저장된 상태 dict 또는 None (파일 없음·설정 불일치 시 — 이 경우 전체 재계산)."""
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        if str(z["settings"]) != repr(sorted(settings.items())):
+            print(f"⚠️ 증분 상태 설정 불일치 → 전체 재계산: {path}")
+            return None
+        n = len(z["lat"])
+        state = {k: z[k] for k in ("lat", "lon", "y", "results")}
+        state["result_cols"] = [str(c) for c in z["result_cols"]]
+        state["w"] = sparse.csr_matrix((z["w_data"], z["w_indices"], z["w_indptr"]), shape=(n, n))
+    return state
+
+
+def incremental_rows(frame: pd.DataFrame, value_cols, w, state: dict, freeze_null=True,
+                     tol=1e-12):
+    """
+    직전 상태와 지점(스냅 좌표 lat/lon)별로 비교해 순열 검정을 다시 해야 하는 지점과 이월 결과표를 만든다.
+    다시 계산: 새로 생긴 지점, 자기 값이 바뀐 지점, 이웃 구성·가중치가 바뀐 지점
+              (사라진 지점을 이웃으로 가졌던 지점 포함), 값이 바뀐(또는 새로 생긴) 지점을 이웃으로 가진 지점
+    freeze_null=True: 이월 지점의 p-value는 직전 y 분포를 귀무분포로 고정한 근사
+        (자기 값·이웃 값·가중치는 그대로이고, 순열 이웃 표본을 뽑는 나머지 지점 값만 다르다)
+    freeze_null=False: 값·지점 구성(순서 포함)과 순열 인덱스 폭이 그대로일 때만 이월 — 이월 값이 전체
+        실행과 비트 단위로 같다. 그렇지 않으면 (None, None) 반환 (전체 재계산)
+    반환: (rows, carry) — rows: 재계산 지점 번호, carry: frame 행 순서의 이전 결과
+          (새 지점 행은 0 — rows에 포함되어 덮어씀)
+    """
+    n, n_prev = len(frame), len(state["lat"])
+    prev_keys = pd.MultiIndex.from_arrays([state["lat"], state["lon"]])
+    # 새 지점 → 이전 지점 번호 (없으면 -1)
+    prev_of = prev_keys.get_indexer(pd.MultiIndex.from_arrays(
+        [frame["lat"].to_numpy("float64"), frame["lon"].to_numpy("float64")]))
+    matched = prev_of >= 0
+
+    y = frame[list(value_cols)].to_numpy("float64")
+    y_now, y_prev = y[matched], state["y"][prev_of[matched]]
+    changed = ~matched
+    changed[matched] = ~((y_now == y_prev) | (np.isnan(y_now) & np.isnan(y_prev))).all(axis=1)
+
+    csr = sparse.csr_matrix(w.sparse, dtype="float64")
+    if not freeze_null:
+        same_points = n == n_prev and np.array_equal(prev_of, np.arange(n))
+        if not same_points or changed.any() or \
+                split_self_weights(csr)[1].shape[1] != split_self_weights(state["w"])[1].shape[1]:
+            return None, None
+
+    # 이전 가중치를 새 지점 번호로 옮겨 행별 차이 비교 (사라진 지점으로의 가중치는 lost로 따로 표시)
+    new_of = np.full(n_prev, -1)
+    new_of[prev_of[matched]] = np.flatnonzero(matched)
+    prev_w = state["w"].tocoo()
+    keep = (new_of[prev_w.row] >= 0) & (new_of[prev_w.col] >= 0)
+    lost = np.zeros(n, dtype=bool)
+    lost[new_of[prev_w.row[~keep & (new_of[prev_w.row] >= 0)]]] = True
+    prev_w = sparse.csr_matrix((prev_w.data[keep], (new_of[prev_w.row[keep]],
+                                                    new_of[prev_w.col[keep]])), shape=(n, n))
+    graph_changed = lost | (np.asarray(abs(csr - prev_w).sum(axis=1)).ravel() > tol)
+
+    neighbor_changed = (abs(csr) @ changed.astype("float64")) > 0
+    rows = np.flatnonzero(changed | graph_changed | neighbor_changed)
+
+    results = np.zeros((n, len(state["result_cols"])))
+    results[matched] = state["results"][prev_of[matched]]
+    carry = pd.DataFrame(results, index=frame.index, columns=state["result_cols"])
+    return rows, carry
+
+
+def k_sweep(points: pd.DataFrame, value_cols, ks, coords=None, permutations=999,
+            seed=1234, workers=1, adaptive=False):
+    """
+    다중 스케일 k 민감도 분석.
+    - KD-tree는 max(ks)로 1회만 질의, 작은 k는 정렬된 이웃 배열을 [:, :k]로 잘라 대역폭·가중치 재계산
+    - k별 Gi* 라벨을 모아 스케일 간 라벨 유지 여부를 집계
+    반환: (labels, summary)
+      labels : 지점별 <col>_label_k{k} + <col>_stable (모든 k에서 같은 라벨이면 그 라벨, 아니면 "Unstable")
+      summary: 컬럼·k별 Hotspot/Coldspot 수와 전 스케일 유지 개수
+    coords 미지정 시 points.geometry(투영 좌표계)에서 좌표를 꺼낸다.
+    """
+    ks = sorted(set(int(k) for k in ks))
+    value_cols = list(value_cols)
+    if coords is None:
+        coords = np.column_stack([points.geometry.x.values, points.geometry.y.values])
+    idx, dist = knn_query(coords, k=ks[-1])
+
+    labels = pd.DataFrame(index=points.index)
+    for k in ks:
+        wsp = WSP(neighbor_arrays_to_csr(idx[:, :k], kernel_weights(dist[:, :k])))
+        res = assign_gi(points[value_cols].copy(), value_cols, wsp,
+                        permutations=permutations, seed=seed, workers=workers,
+                        adaptive=adaptive)
+        for c in value_cols:
+            labels[f"{c.lower()}_label_k{k}"] = res[f"{c.lower()}_label"].values
+
+    rows = []
+    for c in value_cols:
+        lab = labels[[f"{c.lower()}_label_k{k}" for k in ks]].to_numpy()
+        same = (lab == lab[:, :1]).all(axis=1)
+        labels[f"{c.lower()}_stable"] = np.where(same, lab[:, 0], "Unstable")
+        for j, k in enumerate(ks):
+            rows.append({
+                "column": c, "k": k,
+                "hotspots": int((lab[:, j] == "Hotspot").sum()),
+                "coldspots": int((lab[:, j] == "Coldspot").sum()),
+                "stable_hotspots": int((same & (lab[:, 0] == "Hotspot")).sum()),
+                "stable_coldspots": int((same & (lab[:, 0] == "Coldspot")).sum()),
+            })
+    return labels, pd.DataFrame(rows)
 
 
 def main():
-    # 1) 로드 & 숫자화 & 좌표 결측 제거
-    df = pd.read_csv(INPUT_CSV)
-    df = to_numeric(df, ["AMT", "NOC", "lat", "lon"])
-    df = df.dropna(subset=["lat", "lon"]).copy()
+    # 1~2) 청크 단위 로드(필요 컬럼·숫자화·좌표 결측 제거) + 시군 필터(주소 우선, 폴백 BBOX)
+    df = load_sales_csv(INPUT_CSV, sigun=SIGUN, bbox=SIGUN_BBOX)
     if len(df) == 0:
-        raise ValueError("위경도 유효 데이터가 없습니다.")
+        raise ValueError(f"{SIGUN} 범위에서 데이터가 없습니다. meta/BBOX를 확인하세요.")
 
-    # 2) 수원시 필터(주소 우선, 폴백 BBOX)
-    df = filter_suwon_address_first(df)
-    if len(df) == 0:
-        raise ValueError("수원시 범위에서 데이터가 없습니다. meta/BBOX를 확인하세요.")
+    # 3) 좌표 라운딩(또는 격자 셀) → 지점별 합산 → GeoDataFrame(WGS84, point_id 인덱스)
+    gdf = build_points_gdf(df, bin_mode=BIN_MODE, bin_size=BIN_SIZE_M, crs=METRIC_CRS)
 
-    # 3) 좌표 라운딩 → 좌표별 합산 → GeoDataFrame(WGS84)
-    gdf = build_points_gdf(df)
+    # 4) 거리 단위 투영 좌표(UTM52N)를 같은 프레임의 x/y로 추가 (지오메트리는 WGS84 유지)
+    add_metric_xy(gdf, METRIC_CRS)
+    coords = gdf[["x", "y"]].to_numpy()
 
-    # 4) 거리 단위용 투영(UTM52N)
-    gdf_m = gdf.to_crs(32652)
+    # 5) KNN + 적응형(bi-square) 가중치 (KD-tree 배치 질의 → CSR), 격자 모드면 셀 인접 가중치
+    #    타일 모드는 전체 가중치 행렬을 만들지 않고 타일마다 생성
+    tiled = TILED and not BIN_MODE
+    w_adaptive = None
+    if BIN_MODE:
+        w_adaptive = grid_weights(gdf, BIN_MODE)
+        print(f"{BIN_MODE} {BIN_SIZE_M}m 격자: 셀 {len(gdf):,}개 (원본 {len(df):,}행)")
+    elif not tiled:
+        w_adaptive = knn_bisquare_coords(coords, k=K_NEIGHBORS, row_standardize=True,
+                                         cache_dir=WEIGHTS_CACHE_DIR, crs=METRIC_CRS)
 
-    # 5) KNN + 적응형(bi-square) 가중치
-    w_adaptive = knn_bisquare_adaptive(gdf_m, k=K_NEIGHBORS, row_standardize=True)
+    # (옵션) k 스윕: 이웃 질의 1회로 여러 스케일의 라벨 안정성 표 생성 (KNN 가중치 전용)
+    if K_SWEEP and BIN_MODE:
+        print(f"⚠️ BIN_MODE={BIN_MODE!r}는 격자 인접 가중치를 쓰므로 KNN k 스윕을 건너뜁니다.")
+    elif K_SWEEP and not tiled:
+        sweep_labels, sweep_summary = k_sweep(gdf, GI_COLUMNS, K_SWEEP, coords=coords,
+                                              permutations=PERMUTATIONS, seed=RANDOM_SEED,
+                                              workers=WORKERS, adaptive=ADAPTIVE_PERMUTATIONS)
+        sweep_summary.to_csv(f"{OUT_PREFIX}_k_sweep.csv", index=False, encoding="utf-8-sig")
+        pd.concat([gdf[["lat", "lon"]], sweep_labels], axis=1).to_csv(
+            f"{OUT_PREFIX}_k_sweep_labels.csv", index=False, encoding="utf-8-sig")
+        print(sweep_summary.to_string(index=False))
+        print(f"k 스윕 저장 완료: {OUT_PREFIX}_k_sweep.csv")
 
-    # 6) Gi* (AMT/NOC)
-    res_amt = run_gi(gdf_m, "AMT", w_adaptive, "amt",
-                     permutations=PERMUTATIONS, seed=RANDOM_SEED)
-    res_noc = run_gi(gdf_m, "NOC", w_adaptive, "noc",
-                     permutations=PERMUTATIONS, seed=RANDOM_SEED)
+    # (옵션) 증분 모드: 직전 상태와 비교해 값·이웃이 바뀐 지점만 순열 검정, 나머지는 이월
+    perm_cols = permutation_columns(GI_COLUMNS, LOCAL_STATS, ADAPTIVE_PERMUTATIONS)
+    run_settings = dict(columns=tuple(GI_COLUMNS), stats=tuple(LOCAL_STATS), k=K_NEIGHBORS,
+                        permutations=PERMUTATIONS, seed=RANDOM_SEED, perm_chunk=PERM_CHUNK,
+                        adaptive=ADAPTIVE_PERMUTATIONS, alpha=ALPHA,
+                        confidence=EARLY_STOP_CONFIDENCE, crs=METRIC_CRS,
+                        bin_mode=BIN_MODE, bin_size=BIN_SIZE_M)
+    rows = carry = None
+    state = None if tiled else load_run_state(INCREMENTAL_STATE, run_settings)
+    if state is not None:
+        rows, carry = incremental_rows(gdf, GI_COLUMNS, w_adaptive, state,
+                                       freeze_null=INCREMENTAL_FREEZE_NULL)
+        if rows is None:
+            print("값·지점 변경 → 전체 재계산 (INCREMENTAL_FREEZE_NULL=False: 정확한 이월만 허용)")
+        elif len(rows) > INCREMENTAL_MAX_CHANGED * len(gdf):
+            print(f"변경 지점 {len(rows):,}개 (>{INCREMENTAL_MAX_CHANGED:.0%}) → 전체 재계산")
+            rows = carry = None
+        else:
+            print(f"♻️ 증분 재계산: 순열 검정 {len(rows):,} / {len(gdf):,} 지점, 나머지 이월"
+                  + (" (값 변경 시 이월 지점은 직전 귀무분포 고정 근사)" if INCREMENTAL_FREEZE_NULL else ""))
 
-    # 7) WGS84 복귀
-    res_amt = res_amt.to_crs(4326)
-    res_noc = res_noc.to_crs(4326)
+    # 6) Gi* + LISA (GI_COLUMNS × LOCAL_STATS 전체를 공유 가중치·공유 순열로 한 번에, 같은 프레임에 컬럼 추가)
+    if tiled:
+        from hotspot_tiled import assign_local_stats_tiled
+        assign_local_stats_tiled(gdf, GI_COLUMNS, coords, k=K_NEIGHBORS, stats=LOCAL_STATS,
+                                 permutations=PERMUTATIONS, seed=RANDOM_SEED, workers=WORKERS,
+                                 adaptive=ADAPTIVE_PERMUTATIONS)
+    else:
+        assign_local_stats(gdf, GI_COLUMNS, w_adaptive, stats=LOCAL_STATS,
+                           permutations=PERMUTATIONS, seed=RANDOM_SEED, workers=WORKERS,
+                           adaptive=ADAPTIVE_PERMUTATIONS, rows=rows, carry=carry)
+    if INCREMENTAL_STATE and not tiled:
+        save_run_state(INCREMENTAL_STATE, gdf, GI_COLUMNS, w_adaptive, perm_cols, run_settings)
+    if ADAPTIVE_PERMUTATIONS:
+        for c in GI_COLUMNS:
+            for stat in LOCAL_STATS:
+                used = gdf[f"{c.lower()}_{NPERM_SUFFIXES[stat]}"]
+                print(f"{c} {stat}: 순열 {used.sum():,} / {PERMUTATIONS * len(gdf):,}회 사용 "
+                      f"({used.sum() / (PERMUTATIONS * len(gdf)):.1%}), "
+                      f"전체 {PERMUTATIONS}회 사용 지점 {(used == PERMUTATIONS).sum():,}개")
 
-    # 8) CSV (Gi 스코어 포함)
-    merged_df = res_amt.drop(columns=["geometry"]).merge(
-        res_noc.drop(columns=["geometry"]),
-        on=["lat", "lon", "AMT", "NOC"],
-        suffixes=("", "_noc")
-    )
-    cols = ["lat", "lon", "AMT", "NOC",
-            "amt_z", "amt_p", "amt_label",
-            "noc_z", "noc_p", "noc_label"]
-    merged_df = merged_df[cols]
+    def stat_cols(c):
+        cols = [f"{c.lower()}_{s}" for stat in LOCAL_STATS for s in STAT_SUFFIXES[stat]]
+        if ADAPTIVE_PERMUTATIONS:
+            cols += [f"{c.lower()}_{NPERM_SUFFIXES[stat]}" for stat in LOCAL_STATS]
+        return cols
+
+    gi_cols = [col for c in GI_COLUMNS for col in stat_cols(c)]
+    base_cols = ["lat", "lon"] + GI_COLUMNS + (["n_points"] if BIN_MODE else [])
+
+    # 7) CSV (Gi*·LISA 스코어 포함)
     csv_path = f"{OUT_PREFIX}_gi_scores.csv"
-    merged_df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+    gdf[base_cols + gi_cols].to_csv(csv_path, index=False, encoding="utf-8-sig")
     print(f"CSV 저장 완료: {csv_path}")
 
-    # 9) 통합 GeoJSON (카카오맵 토글용)
-    gdf_join = res_amt[["lat", "lon", "AMT", "NOC",
-                        "amt_z", "amt_p", "amt_label", "geometry"]].copy()
-    gdf_join = gdf_join.merge(
-        res_noc[["lat", "lon", "noc_z", "noc_p", "noc_label"]],
-        on=["lat", "lon"],
-        how="left"
-    )
+    # 8) 통합 GeoJSON (카카오맵 토글용, lat/lon 컬럼에서 바로 스트리밍 저장)
     unified_geojson = f"{OUT_PREFIX}_gi_unified.geojson"
-    gdf_join.to_file(unified_geojson, driver="GeoJSON", encoding="utf-8")
+    write_points_geojson(gdf[base_cols + gi_cols], unified_geojson)
     print(f"통합 GeoJSON 저장 완료: {unified_geojson}")
 
+    # 9) 컬럼형 출력 (타입 축소 float32/int32/category, 노트북·지도 내보내기에서 재파싱 없이 로드)
+    if COLUMNAR_FORMATS:
+        try:
+            for fmt in COLUMNAR_FORMATS:
+                path = write_columnar(gdf[base_cols + gi_cols + ["geometry"]],
+                                      f"{OUT_PREFIX}_gi.{fmt}")
+                print(f"컬럼형 저장 완료: {path}")
+        except ImportError as e:
+            print(f"⚠️ {e} — 컬럼형 출력 건너뜀")
+
     # (옵션) 개별 GeoJSON도 저장
     if SAVE_SEPARATE_GEOJSON:
-        res_amt.to_file(f"{OUT_PREFIX}_amt.geojson", driver="GeoJSON", encoding="utf-8")
-        res_noc.to_file(f"{OUT_PREFIX}_noc.geojson", driver="GeoJSON", encoding="utf-8")
+        for c in GI_COLUMNS:
+            cols = base_cols + stat_cols(c)
+            write_points_geojson(gdf[cols], f"{OUT_PREFIX}_{c.lower()}.geojson")
         print("개별 GeoJSON 저장 완료.")
 
-    print("✅ 완료! 수원시 Gi* 분석 산출물 생성됨.")
+    print("✅ 완료! 수원시 Gi*·LISA 분석 산출물 생성됨.")
 
 
 if __name__ == "__main__":
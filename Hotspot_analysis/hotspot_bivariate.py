@@ -0,0 +1,149 @@
+"""
+매출 × 불법주차 단속 이변량(bivariate) 국지 연관 분석
+- 단속 건수(violations.json, 지점별 전 시간대·방법 합)를 매출 지점(또는 격자 셀) 반경 RADIUS_M 안에서
+  KD-tree로 합산 → 지점별 ENF 컬럼
+- hotspot.py와 같은 지점·같은 가중치(KNN bi-square 또는 격자 인접)로
+  · 이변량 Moran's I: 지점의 매출(AMT) × 이웃의 단속 강도(ENF) — esda Moran_Local_BV와 같은 식
+  · 이변량 Gi*: 매출 Gi*와 단속 Gi*가 둘 다 유의한 지점의 (핫/콜드) 조합
+- 세 통계량 모두 순열 lag의 일차식이라 [AMT, ENF] 두 값 컬럼의 순열 이웃 합을 한 번만 모아 같은 순열로 검정
+- 라벨: "High sales-High enforcement" / "High sales-Low enforcement" /
+        "Low sales-High enforcement" / "Low sales-Low enforcement" / "Not significant"
+  → 탄력 주차 제안의 활성 상권(고매출-고단속)·침체 상권(저매출-고단속) 구분에 바로 사용
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from hotspot import (INPUT_CSV, SIGUN, SIGUN_BBOX, METRIC_CRS, BIN_MODE, BIN_SIZE_M,
+                     K_NEIGHBORS, PERMUTATIONS, RANDOM_SEED, WORKERS, ALPHA, WEIGHTS_CACHE_DIR,
+                     COLUMNAR_FORMATS, load_sales_csv, build_points_gdf, add_metric_xy,
+                     grid_weights, knn_bisquare_coords, gi_star_terms, bivariate_moran_terms,
+                     split_self_weights, crand_p_sim, label_gi)
+from hotspot_spacetime import VIOLATIONS_JSON, load_violation_cube
+from result_io import write_columnar, write_points_geojson
+
+# ========= 설정 =========
+# 단속 방법 (None이면 전체 합산, 예: ["국민신문고", "주민신고제"])
+TYPES = None
+
+# 매출 지점 주변 단속 건수 합산 반경(m)
+RADIUS_M = 200
+
+SALES_COLUMN = "AMT"     # 매출 쪽 값 컬럼 (AMT 또는 NOC)
+ENF_COLUMN = "ENF"       # 반경 합산 단속 건수 컬럼 이름
+
+OUT_PREFIX = "suwon_sales_enforcement"
+# ========================
+
+BV_LABELS = {(True, True): "High sales-High enforcement",
+             (True, False): "High sales-Low enforcement",
+             (False, True): "Low sales-High enforcement",
+             (False, False): "Low sales-Low enforcement"}
+
+
+def load_enforcement_points(path: str, types=None) -> pd.DataFrame:
+    """violations.json → 단속 지점표 (lat, lon, count: 전 시간대 합)."""
+    points, cube = load_violation_cube(path, types=types)
+    return points.assign(count=cube.sum(axis=1))
+
+
+def radius_sum(target_xy: np.ndarray, source_xy: np.ndarray, values: np.ndarray,
+               radius: float) -> np.ndarray:
+    """
+    target 지점마다 반경 radius(m) 안 source 값의 합 (투영 좌표).
+    두 KD-tree의 쌍 질의 한 번으로 (target, source, 거리) 쌍을 얻어 bincount로 합산.
+    """
+    pairs = cKDTree(target_xy).sparse_distance_matrix(cKDTree(source_xy), radius,
+                                                      output_type="ndarray")
+    return np.bincount(pairs["i"], weights=values[pairs["j"]], minlength=len(target_xy))
+
+
+def label_bivariate(high_x: np.ndarray, high_y: np.ndarray, significant: np.ndarray) -> np.ndarray:
+    quad = np.where(high_x, np.where(high_y, BV_LABELS[True, True], BV_LABELS[True, False]),
+                    np.where(high_y, BV_LABELS[False, True], BV_LABELS[False, False]))
+    return np.where(significant, quad, "Not significant")
+
+
+def assign_bivariate(frame: pd.DataFrame, x_col: str, y_col: str, w, permutations=999,
+                     seed=1234, workers=1, alpha=ALPHA) -> pd.DataFrame:
+    """
+    x_col(매출) × y_col(단속) 이변량 국지 통계량을 frame에 컬럼으로 추가.
+    - bv_i / bv_p / bv_label: 이변량 Moran's I (y만 순열, 사분면 = zx 부호 × y 공간시차 부호)
+    - <x>_z / <x>_p, <y>_z / <y>_p, bv_gi_label: 각 변수 Gi*와 둘 다 유의한 지점의 핫/콜드 조합
+    순열 인덱스는 세 통계량이 공유 (crand_p_sim의 col로 통계량별 순열 값 컬럼 지정).
+    """
+    xy = frame[[x_col, y_col]].apply(pd.to_numeric, errors="coerce").fillna(0)\
+        .astype("float64").values
+    x, y = xy[:, :1], xy[:, 1:]
+
+    g, gz, g_a, g_b = gi_star_terms(xy, w)
+    bv_i, bv_a, bv_b, zx, zlag = bivariate_moran_terms(x, y, w)
+    obs, a, b = np.hstack([g, bv_i]), np.hstack([g_a, bv_a]), np.hstack([g_b, bv_b])
+
+    _, w_other = split_self_weights(sparse.csr_matrix(w.sparse, dtype="float64"))
+    p_sim = crand_p_sim(xy, w_other, obs, a, b, col=[0, 1, 1], permutations=permutations,
+                        seed=seed, workers=workers)
+    # 이웃이 없는 지점은 검정 불가 → p = NaN
+    p_sim[~(w_other > 0).any(axis=1)] = np.nan
+
+    x_lab, y_lab = label_gi(gz[:, 0], p_sim[:, 0], alpha), label_gi(gz[:, 1], p_sim[:, 1], alpha)
+    for j, c in enumerate([x_col, y_col]):
+        frame[f"{c.lower()}_z"] = gz[:, j]
+        frame[f"{c.lower()}_p"] = p_sim[:, j]
+    frame["bv_gi_label"] = label_bivariate(x_lab == "Hotspot", y_lab == "Hotspot",
+                                           (x_lab != "Not significant") & (y_lab != "Not significant"))
+
+    frame["bv_i"] = bv_i[:, 0]
+    frame["bv_p"] = p_sim[:, 2]
+    frame["bv_label"] = label_bivariate(zx[:, 0] > 0, zlag[:, 0] > 0, p_sim[:, 2] <= alpha)
+    return frame
+
+
+def main():
+    # 1) 매출 지점 — hotspot.py와 같은 로드·스냅(격자)·가중치 (가중치 캐시 공유)
+    df = load_sales_csv(INPUT_CSV, sigun=SIGUN, bbox=SIGUN_BBOX)
+    if len(df) == 0:
+        raise ValueError(f"{SIGUN} 범위에서 데이터가 없습니다. meta/BBOX를 확인하세요.")
+    gdf = build_points_gdf(df, bin_mode=BIN_MODE, bin_size=BIN_SIZE_M, crs=METRIC_CRS)
+    add_metric_xy(gdf, METRIC_CRS)
+    coords = gdf[["x", "y"]].to_numpy()
+    if BIN_MODE:
+        w = grid_weights(gdf, BIN_MODE)
+    else:
+        w = knn_bisquare_coords(coords, k=K_NEIGHBORS, row_standardize=True,
+                                cache_dir=WEIGHTS_CACHE_DIR, crs=METRIC_CRS)
+
+    # 2) 단속 건수 → 매출 지점 반경 합산
+    enf = load_enforcement_points(VIOLATIONS_JSON, types=TYPES)
+    add_metric_xy(enf, METRIC_CRS)
+    gdf[ENF_COLUMN] = radius_sum(coords, enf[["x", "y"]].to_numpy(),
+                                 enf["count"].to_numpy("float64"), RADIUS_M)
+    print(f"매출 지점 {len(gdf):,}개, 단속 지점 {len(enf):,}개 → 반경 {RADIUS_M}m 합산 "
+          f"(단속 0건 지점 {(gdf[ENF_COLUMN] == 0).sum():,}개)")
+
+    # 3) 이변량 Moran's I + 이변량 Gi* (공유 가중치·공유 순열)
+    assign_bivariate(gdf, SALES_COLUMN, ENF_COLUMN, w, permutations=PERMUTATIONS,
+                     seed=RANDOM_SEED, workers=WORKERS)
+    print(pd.crosstab(gdf["bv_label"], gdf["bv_gi_label"], margins=True).to_string())
+
+    # 4) 저장 (CSV / GeoJSON / 컬럼형)
+    sx, ex = SALES_COLUMN.lower(), ENF_COLUMN.lower()
+    cols = ["lat", "lon", SALES_COLUMN, ENF_COLUMN] + (["n_points"] if BIN_MODE else []) + \
+        [f"{sx}_z", f"{sx}_p", f"{ex}_z", f"{ex}_p", "bv_gi_label", "bv_i", "bv_p", "bv_label"]
+    gdf[cols].to_csv(f"{OUT_PREFIX}.csv", index=False, encoding="utf-8-sig")
+    write_points_geojson(gdf[cols], f"{OUT_PREFIX}.geojson")
+    print(f"CSV/GeoJSON 저장 완료: {OUT_PREFIX}.csv, {OUT_PREFIX}.geojson")
+    if COLUMNAR_FORMATS:
+        try:
+            for fmt in COLUMNAR_FORMATS:
+                path = write_columnar(gdf[cols + ["geometry"]], f"{OUT_PREFIX}.{fmt}")
+                print(f"컬럼형 저장 완료: {path}")
+        except ImportError as e:
+            print(f"⚠️ {e} — 컬럼형 출력 건너뜀")
+
+    print("✅ 완료! 매출 × 단속 이변량 국지 연관 산출물 생성됨.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+불법주차 단속 신흥(emerging) 핫스팟 추세 분석
+- 입력: 단속 원자료 CSV (공영주차장_불법주차_거리분석/data/01_데이터전처리.py가 만드는 정리된_주차단속데이터.csv,
+  단속일시정보 / 위도_y / 경도_x / 단속방법 컬럼) — violations.json에는 월 정보가 없어 원자료 사용
+- 지점(좌표 소수 5자리 스냅) × 월 건수 행렬 (N, T) → 같은 가중치 하나로 T개 월 슬라이스 Gi*를
+  희소 곱 한 번에 계산 (순열 검정 시에도 T개 컬럼을 한 번의 순열로)
+- (N, T) z-score 행렬에 Mann–Kendall 추세 검정을 지점 반복 없이 한 번에 적용
+  (시차 d = 1..T-1 반복만 있고, 동순위(tie) 보정도 행 정렬 + reduceat으로 벡터화)
+- 단속이 한 건도 없는 달(Σy = 0)은 Gi*가 정의되지 않으므로 z·p = NaN으로 두고 추세 검정·비율에서 제외
+- 분류 (ESRI Emerging Hot Spot Analysis 정의 축약):
+  · New: 마지막 달만 유의한 핫스팟 (이전 달은 한 번도 아님)
+  · Intensifying: 90% 이상 달 핫스팟 + 마지막 달 핫스팟 + z 증가 추세 유의
+  · Persistent: 90% 이상 달 핫스팟 + 마지막 달 핫스팟 + 추세 없음
+  · Diminishing: 90% 이상 달 핫스팟 + 마지막 달 핫스팟 + z 감소 추세 유의
+  · 나머지: No pattern
+"""
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from scipy.stats import norm
+
+from hotspot import (METRIC_CRS, K_NEIGHBORS, RANDOM_SEED, WORKERS, ALPHA, WEIGHTS_CACHE_DIR,
+                     COLUMNAR_FORMATS, add_metric_xy, knn_bisquare_coords, gi_star_weights,
+                     gi_star_z, assign_gi)
+from result_io import write_columnar, write_points_geojson
+
+# ========= 설정 =========
+VIOLATIONS_CSV = "../공영주차장_불법주차_거리분석/data/정리된_주차단속데이터.csv"
+DATE_COLUMN = "단속일시정보"
+LAT_COLUMN, LON_COLUMN = "위도_y", "경도_x"
+TYPE_COLUMN = "단속방법"
+
+# 분석할 단속 방법 (None이면 전체)
+TYPES = None
+
+# 월 슬라이스 Gi* p-value: 0이면 정규근사, >0이면 조건부 순열 (T개 월을 한 번의 순열로)
+PERMUTATIONS = 0
+
+PERSISTENT_RATIO = 0.9   # 핫스팟 달 비율 기준 (ESRI 기본 90%)
+TREND_ALPHA = 0.05       # Mann–Kendall 추세 유의수준
+MIN_MONTHS = 10          # 이보다 짧으면 추세 검정이 의미 없으므로 중단
+
+OUT_PREFIX = "suwon_emerging_hotspots"
+# ========================
+
+PATTERNS = ["New", "Intensifying", "Persistent", "Diminishing", "No pattern"]
+
+
+def load_violation_months(path: str, types=None):
+    """
+    단속 원자료 CSV → (지점표 lat/lon (N행), 월 라벨 PeriodIndex (T), 건수 행렬 (N, T)).
+    첫 달~마지막 달 사이 단속이 없는 달도 0으로 채운다.
+    """
+    usecols = [DATE_COLUMN, LAT_COLUMN, LON_COLUMN] + ([TYPE_COLUMN] if types is not None else [])
+    df = pd.read_csv(path, usecols=usecols, encoding="utf-8-sig")
+    if types is not None:
+        df = df[df[TYPE_COLUMN].isin(types)]
+    when = pd.to_datetime(df[DATE_COLUMN], errors="coerce")
+    lat = pd.to_numeric(df[LAT_COLUMN], errors="coerce").round(5)
+    lon = pd.to_numeric(df[LON_COLUMN], errors="coerce").round(5)
+    ok = (when.notna() & lat.notna() & lon.notna()).to_numpy()
+    when, lat, lon = when[ok], lat[ok], lon[ok]
+
+    month = (when.dt.year * 12 + when.dt.month - 1).to_numpy(np.int64)
+    m0, n_months = month.min(), month.max() - month.min() + 1
+    loc_id, locs = pd.factorize(pd.MultiIndex.from_arrays([lat, lon]))
+    points = pd.DataFrame({"lat": locs.get_level_values(0).astype("float64"),
+                           "lon": locs.get_level_values(1).astype("float64")})
+    cube = np.bincount(loc_id * n_months + (month - m0),
+                       minlength=len(points) * n_months).reshape(len(points), n_months)
+    months = pd.period_range(pd.Period(year=m0 // 12, month=m0 % 12 + 1, freq="M"),
+                             periods=n_months, freq="M")
+    return points, months, cube.astype("float64")
+
+
+def monthly_gi(cube: np.ndarray, w, permutations=PERMUTATIONS, seed=RANDOM_SEED,
+               workers=WORKERS):
+    """
+    월 슬라이스별 Gi* (z, p) 각 (N, T) — 가중치 하나, 희소 곱/순열 한 번.
+    전체 건수가 0인 달은 계산에서 빼고 z·p = NaN (Σy = 0 으로 나누지 않도록).
+    """
+    z = np.full(cube.shape, np.nan)
+    p = np.full(cube.shape, np.nan)
+    live = cube.sum(axis=0) > 0
+    sub = cube[:, live]
+    if permutations:
+        cols = [f"m{t}" for t in range(sub.shape[1])]
+        frame = pd.DataFrame(sub, columns=cols)
+        assign_gi(frame, cols, w, permutations=permutations, seed=seed, workers=workers)
+        z[:, live] = frame[[f"{c}_z" for c in cols]].to_numpy()
+        p[:, live] = frame[[f"{c}_p" for c in cols]].to_numpy()
+    else:
+        _, z[:, live] = gi_star_z(sub, gi_star_weights(w, star=0.5))
+        p[:, live] = norm.sf(np.abs(z[:, live]))
+    return z, p
+
+
+def mann_kendall(x: np.ndarray):
+    """
+    행별 Mann–Kendall 추세 검정 (x: (N, T), 시간 축 = 열).
+    S = Σ_{i<j} sign(x_j - x_i), 분산은 동순위 보정, 연속성 보정 z.
+    NaN(빈 달 등)은 건너뛴다: 행별 유효 관측 수 m으로 분산·tau를 계산.
+    반환: (S, tau = S / (m(m-1)/2), z, 양측 p) 각 (N,)
+    """
+    n_rows, t = x.shape
+    m = np.isfinite(x).sum(axis=1)
+    s = np.zeros(n_rows)
+    for d in range(1, t):
+        s += np.nansum(np.sign(x[:, d:] - x[:, :-d]), axis=1)
+
+    # 동순위 묶음 크기 g마다 g(g-1)(2g+5): 행 정렬 후 값이 바뀌는 위치(+ 행 경계)로 묶음을 나눈다
+    # (NaN은 정렬 끝에 모이고 NaN != NaN 이라 각자 크기 1 묶음 → 보정항 0)
+    srt = np.sort(x, axis=1)
+    start = np.ones((n_rows, t), dtype=bool)
+    start[:, 1:] = srt[:, 1:] != srt[:, :-1]
+    flat = np.flatnonzero(start.ravel())
+    g = np.diff(np.append(flat, start.size))
+    ties = np.add.reduceat(g * (g - 1) * (2 * g + 5), np.searchsorted(flat, np.arange(n_rows) * t))
+
+    var = (m * (m - 1) * (2 * m + 5) - ties) / 18.0
+    pairs = m * (m - 1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(var > 0, (s - np.sign(s)) / np.sqrt(var), 0.0)
+        tau = np.where(pairs > 0, s / pairs, 0.0)
+    return s, tau, z, 2 * norm.sf(np.abs(z))
+
+
+def classify_emerging(gi_z: np.ndarray, gi_p: np.ndarray, mk_z: np.ndarray, mk_p: np.ndarray,
+                      alpha=ALPHA, trend_alpha=TREND_ALPHA, ratio=PERSISTENT_RATIO) -> np.ndarray:
+    """월별 Gi* 핫스팟 여부 + z 추세로 지점별 패턴 라벨 (PATTERNS). 핫스팟 비율은 NaN(빈 달) 제외."""
+    hot = (gi_z > 0) & (gi_p <= alpha)
+    last = hot[:, -1]
+    frequent = last & (hot.sum(axis=1) >= ratio * np.isfinite(gi_z).sum(axis=1))
+    trend = mk_p <= trend_alpha
+    return np.select(
+        [last & ~hot[:, :-1].any(axis=1),
+         frequent & trend & (mk_z > 0),
+         frequent & ~trend,
+         frequent & trend & (mk_z < 0)],
+        PATTERNS[:4], default=PATTERNS[4])
+
+
+def emerging_hotspots(points: pd.DataFrame, cube: np.ndarray, k=K_NEIGHBORS,
+                      permutations=PERMUTATIONS, seed=RANDOM_SEED, workers=WORKERS,
+                      cache_dir=WEIGHTS_CACHE_DIR) -> pd.DataFrame:
+    """
+    지점별 요약: lat, lon, total, hot_months, last_z, mk_tau, mk_z, mk_p, pattern
+    (+ 월별 z-score 행렬은 반환 프레임의 attrs["gi_z"])
+    """
+    add_metric_xy(points, METRIC_CRS)
+    w = knn_bisquare_coords(points[["x", "y"]].to_numpy(), k=k, row_standardize=True,
+                            cache_dir=cache_dir, crs=METRIC_CRS)
+    gi_z, gi_p = monthly_gi(cube, w, permutations, seed, workers)
+    _, tau, mk_z, mk_p = mann_kendall(gi_z)
+
+    out = points[["lat", "lon"]].assign(
+        total=cube.sum(axis=1).astype(np.int64),
+        hot_months=((gi_z > 0) & (gi_p <= ALPHA)).sum(axis=1),
+        last_z=gi_z[:, -1], mk_tau=tau, mk_z=mk_z, mk_p=mk_p,
+        pattern=classify_emerging(gi_z, gi_p, mk_z, mk_p))
+    out.attrs["gi_z"] = gi_z
+    return out
+
+
+def main():
+    points, months, cube = load_violation_months(VIOLATIONS_CSV, types=TYPES)
+    print(f"단속 지점 {len(points):,}개 × {len(months)}개월 ({months[0]}~{months[-1]}), "
+          f"총 {cube.sum():,.0f}건")
+    empty = int((cube.sum(axis=0) == 0).sum())
+    if empty:
+        print(f"⚠️ 단속 기록이 없는 달 {empty}개는 Gi*·추세 검정에서 제외합니다.")
+    if len(months) - empty < MIN_MONTHS:
+        raise ValueError(f"월 슬라이스가 {len(months) - empty}개뿐입니다 (최소 {MIN_MONTHS}개).")
+
+    result = emerging_hotspots(points, cube)
+    print(result["pattern"].value_counts().reindex(PATTERNS, fill_value=0).to_string())
+
+    result.to_csv(f"{OUT_PREFIX}.csv", index=False, encoding="utf-8-sig")
+    write_points_geojson(result[result["pattern"] != PATTERNS[4]], f"{OUT_PREFIX}.geojson")
+    print(f"CSV/GeoJSON 저장 완료: {OUT_PREFIX}.csv, {OUT_PREFIX}.geojson (패턴 지점만)")
+    if COLUMNAR_FORMATS:
+        try:
+            # 월별 z-score 열(z_YYYY-MM)까지 함께 저장 → 지도에서 월 슬라이더로 재생
+            z_cols = pd.DataFrame(result.attrs["gi_z"], columns=[f"z_{m}" for m in months])
+            full = pd.concat([result.reset_index(drop=True), z_cols], axis=1)
+            full = gpd.GeoDataFrame(full, geometry=gpd.points_from_xy(full["lon"], full["lat"]),
+                                    crs="EPSG:4326")
+            for fmt in COLUMNAR_FORMATS:
+                path = write_columnar(full, f"{OUT_PREFIX}.{fmt}")
+                print(f"컬럼형 저장 완료: {path}")
+        except ImportError as e:
+            print(f"⚠️ {e} — 컬럼형 출력 건너뜀")
+
+    print("✅ 완료! 단속 신흥 핫스팟 추세 산출물 생성됨.")
+
+
+if __name__ == "__main__":
+    main()
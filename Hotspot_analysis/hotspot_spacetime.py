@@ -0,0 +1,138 @@
+"""
+불법주차 단속 시공간(space–time) Gi* 핫스팟
+- 입력: 지도시각화/data/violations.json (지점·시간대·단속방법별 건수)
+- 셀 = (지점, 시간대) 24 × N개, 셀 값 = 단속 건수 합
+- 시공간 가중치 = 적응형 bi-square 공간 이웃(+자기 지점) × 같은/인접 시간대
+  W_st = kron(T, S) - I  (S: 공간 가중치 + 자기 지점 1, T: 같은 시간 1 + 인접 시간 HOUR_WEIGHT)
+- 24 × N 셀 전체의 G*를 희소 행렬 곱 한 번으로 계산 (시간대별 24회 반복 실행 없음)
+- 출력: 지도 시간 슬라이더용 시간대별 핫/콜드스팟 라벨 JSON (violations.json과 같은 lat/lon/hour 레코드)
+"""
+import json
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.stats import norm
+from libpysal.weights import WSP
+
+from hotspot import (METRIC_CRS, K_NEIGHBORS, RANDOM_SEED, WORKERS, WEIGHTS_CACHE_DIR,
+                     add_metric_xy, knn_bisquare_coords, gi_star_weights, gi_star_z,
+                     assign_gi, label_gi)
+
+# ========= 설정 =========
+VIOLATIONS_JSON = "../지도시각화/data/violations.json"
+OUT_JSON = "../지도시각화/data/violations_hotspots.json"
+
+# 분석할 단속 방법 (None이면 전체 합산, 예: ["국민신문고", "주행형"])
+TYPES = None
+
+N_HOURS = 24
+HOUR_WEIGHT = 0.5        # 인접 시간대 같은 위치/이웃 위치의 가중치 (같은 시간대 = 1)
+CIRCULAR_HOURS = True    # 23시와 0시를 인접 시간대로 볼지
+
+# 0이면 정규근사 p-value(esda G_Local.p_norm과 같은 단측), >0이면 조건부 순열 p-value
+PERMUTATIONS = 0
+
+# 유의한 셀만 저장할지 (False면 24 × N 셀 전체)
+ONLY_SIGNIFICANT = True
+# ========================
+
+
+def load_violation_cube(path: str, types=None, n_hours=N_HOURS):
+    """
+    violations.json → (지점표 lat/lon (N행), 건수 배열 (N, n_hours)).
+    같은 지점·시간대의 여러 단속 방법은 합산 (types 지정 시 해당 방법만).
+    """
+    with open(path, encoding="utf-8") as f:
+        df = pd.DataFrame(json.load(f))
+    if types is not None:
+        df = df[df["type"].isin(types)]
+    df["hour"] = pd.to_numeric(df["hour"], errors="coerce")
+    df["count"] = pd.to_numeric(df["count"], errors="coerce").fillna(0)
+    df = df.dropna(subset=["lat", "lon", "hour"])
+    df = df[(df["hour"] >= 0) & (df["hour"] < n_hours)]
+
+    loc_id, locs = pd.factorize(pd.MultiIndex.from_arrays([df["lat"], df["lon"]]))
+    points = pd.DataFrame({"lat": locs.get_level_values(0).astype("float64"),
+                           "lon": locs.get_level_values(1).astype("float64")})
+    cube = np.zeros((len(points), n_hours))
+    np.add.at(cube, (loc_id, df["hour"].to_numpy(dtype=np.int64)), df["count"].to_numpy("float64"))
+    return points, cube
+
+
+def hour_adjacency(n_hours=N_HOURS, hour_weight=HOUR_WEIGHT, circular=CIRCULAR_HOURS):
+    """시간 가중치 T (n_hours × n_hours): 대각 1, 인접 시간대 hour_weight."""
+    off = np.full(n_hours - 1, hour_weight)
+    t = sparse.diags([off, np.ones(n_hours), off], [-1, 0, 1], format="lil")
+    if circular and n_hours > 2:
+        t[0, n_hours - 1] = t[n_hours - 1, 0] = hour_weight
+    return sparse.csr_matrix(t)
+
+
+def spacetime_weights(w_spatial, n_hours=N_HOURS, hour_weight=HOUR_WEIGHT,
+                      circular=CIRCULAR_HOURS) -> WSP:
+    """
+    공간 가중치(행표준화 전 bi-square, WSP) → 시공간 가중치 WSP ((n_hours·N)²).
+    셀 번호 = hour * N + 지점 번호. 자기 셀은 제외하고 행표준화.
+    """
+    s = sparse.csr_matrix(w_spatial.sparse, dtype="float64")
+    n = s.shape[0]
+    s = s + sparse.identity(n, format="csr")
+    st = sparse.kron(hour_adjacency(n_hours, hour_weight, circular), s, format="csr")
+    st.setdiag(0)
+    st.eliminate_zeros()
+    rs = np.asarray(st.sum(axis=1)).ravel()
+    inv = np.divide(1.0, rs, out=np.zeros_like(rs), where=rs > 0)
+    return WSP(sparse.csr_matrix(sparse.diags(inv) @ st))
+
+
+def spacetime_gi(points: pd.DataFrame, cube: np.ndarray, k=K_NEIGHBORS,
+                 hour_weight=HOUR_WEIGHT, circular=CIRCULAR_HOURS, permutations=PERMUTATIONS,
+                 seed=RANDOM_SEED, workers=WORKERS, cache_dir=WEIGHTS_CACHE_DIR) -> pd.DataFrame:
+    """
+    24 × N 셀 전체 G* (셀 순서: hour 우선).
+    반환 컬럼: lat, lon, hour, count, z, p, label
+    """
+    n, n_hours = cube.shape
+    add_metric_xy(points, METRIC_CRS)
+    w_s = knn_bisquare_coords(points[["x", "y"]].to_numpy(), k=k, row_standardize=False,
+                              cache_dir=cache_dir, crs=METRIC_CRS)
+    w_st = spacetime_weights(w_s, n_hours, hour_weight, circular)
+
+    cells = pd.DataFrame({
+        "lat": np.tile(points["lat"].to_numpy(), n_hours),
+        "lon": np.tile(points["lon"].to_numpy(), n_hours),
+        "hour": np.repeat(np.arange(n_hours), n),
+        "count": cube.T.ravel(),
+    })
+    if permutations:
+        assign_gi(cells, ["count"], w_st, prefixes=[""], permutations=permutations,
+                  seed=seed, workers=workers)
+        return cells.rename(columns={"_z": "z", "_p": "p", "_label": "label"})
+
+    _, z = gi_star_z(cells["count"].to_numpy("float64"), gi_star_weights(w_st, star=0.5))
+    p = norm.sf(np.abs(z))
+    cells["z"], cells["p"], cells["label"] = z, p, label_gi(z, p)
+    return cells
+
+
+def main():
+    points, cube = load_violation_cube(VIOLATIONS_JSON, types=TYPES)
+    print(f"단속 지점 {len(points):,}개 × {cube.shape[1]}시간대 = 셀 {cube.size:,}개, "
+          f"총 {cube.sum():,.0f}건")
+
+    cells = spacetime_gi(points, cube)
+
+    summary = (cells.groupby(["hour", "label"]).size().unstack(fill_value=0)
+               .reindex(columns=["Hotspot", "Coldspot"], fill_value=0))
+    print(summary.T.to_string())
+
+    out = cells[cells["label"] != "Not significant"] if ONLY_SIGNIFICANT else cells
+    out = out.assign(count=out["count"].astype(np.int64), z=out["z"].round(4), p=out["p"].round(6))
+    with open(OUT_JSON, "w", encoding="utf-8") as f:
+        json.dump(out[["lat", "lon", "hour", "count", "z", "p", "label"]].to_dict("records"),
+                  f, ensure_ascii=False)
+    print(f"✅ 시공간 핫스팟 저장 완료: {OUT_JSON} ({len(out):,}셀)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+타일 분할 Gi*/LISA (경기도 전체처럼 수십만~백만 지점용)
+- 투영 좌표 공간을 tile_size(m) 정사각 타일로 나누고, 타일마다 핵심(core) 지점 + halo 지점으로
+  KNN·bi-square 가중치·통계량·조건부 순열 검정을 별도 프로세스에서 실행
+- halo 충분 조건: 모든 핵심 지점의 k번째 이웃 거리 ≤ 확장 경계까지의 거리
+  (만족하지 않으면 그 타일의 halo를 2배로 늘려 다시 질의)
+- 전역 요약값(global_moments)과 전체 값 배열 y, 전체 그래프 기준 순열 폭을 모든 타일이 공유하고
+  타일 안 지점 순서를 전체 순서와 같게 유지 → 단일 그래프 실행(assign_local_stats)과 비트 단위로 같은 결과
+- 타일 하나의 메모리: (핵심+halo 지점 수) × k 이웃 배열·희소 행렬 (+ 전체 y·좌표 배열)
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+from libpysal.weights import WSP
+
+from hotspot import (K_NEIGHBORS, ALPHA, EARLY_STOP_CONFIDENCE, knn_query, kernel_weights,
+                     neighbor_arrays_to_csr, global_moments, local_stat_terms,
+                     split_self_weights, crand_p_sim, crand_sequential, write_local_stats)
+
+# 타일 한 변(m)과 시작 halo 폭(m) — halo는 부족한 타일에서만 자동으로 2배씩 늘어난다
+TILE_SIZE_M = 5000
+TILE_HALO_M = 1000
+
+_TILE_STATE = {}
+
+
+def make_tiles(coords: np.ndarray, tile_size: float):
+    """
+    지점 → 타일 목록 [(경계 (x0, y0, x1, y1), 핵심 지점 번호(오름차순)), ...].
+    빈 타일은 만들지 않는다.
+    """
+    origin = coords.min(axis=0)
+    cell = np.floor((coords - origin) / tile_size).astype(np.int64)
+    keys, inv = np.unique(cell, axis=0, return_inverse=True)
+    inv = inv.ravel()
+    order = np.argsort(inv, kind="stable")
+    splits = np.cumsum(np.bincount(inv, minlength=len(keys)))[:-1]
+    tiles = []
+    for key, core in zip(keys, np.split(order, splits)):
+        x0, y0 = origin + key * tile_size
+        tiles.append(((x0, y0, x0 + tile_size, y0 + tile_size), core))
+    return tiles
+
+
+def _tile_init(state):
+    _TILE_STATE.clear()
+    _TILE_STATE.update(state)
+
+
+def _tile_pool(state, workers: int, n_tiles: int):
+    """workers <= 1 이면 현재 프로세스에서 실행 (None 반환), 아니면 타일 단위 프로세스 풀."""
+    if workers <= 1 or n_tiles == 1:
+        _tile_init(state)
+        return nullcontext(None)
+    return ProcessPoolExecutor(max_workers=min(workers, n_tiles),
+                               initializer=_tile_init, initargs=(state,))
+
+
+def _map(ex, fn, items):
+    return [fn(t) for t in items] if ex is None else list(ex.map(fn, items))
+
+
+def tile_neighbors(coords: np.ndarray, bounds, core: np.ndarray, k: int, halo: float):
+    """
+    핵심 지점의 k-이웃이 모두 들어올 때까지 halo를 늘리며 타일 KNN 질의.
+    반환: (halo, 타일 지점 번호(오름차순), 타일 내 핵심 위치, idx, dist)
+    """
+    x0, y0, x1, y1 = bounds
+    x, y = coords[:, 0], coords[:, 1]
+    lo, hi = coords.min(axis=0), coords.max(axis=0)
+    while True:
+        ex0, ey0, ex1, ey1 = x0 - halo, y0 - halo, x1 + halo, y1 + halo
+        covers_all = ex0 <= lo[0] and ey0 <= lo[1] and ex1 >= hi[0] and ey1 >= hi[1]
+        tile = np.flatnonzero((x >= ex0) & (x <= ex1) & (y >= ey0) & (y <= ey1))
+        if len(tile) > k:
+            idx, dist = knn_query(coords[tile], k=k)
+            pos = np.searchsorted(tile, core)
+            cx, cy = x[core], y[core]
+            room = np.minimum.reduce([cx - ex0, ex1 - cx, cy - ey0, ey1 - cy])
+            if covers_all or (dist[pos, -1] <= room).all():
+                return halo, tile, pos, idx, dist
+        elif covers_all:
+            raise ValueError(f"지점 수({len(tile)})가 k({k})보다 커야 합니다.")
+        halo *= 2
+
+
+def _tile_width(spec):
+    """1단계: 타일 핵심 지점의 (halo, 0이 아닌 이웃 가중치 최대 개수)."""
+    st = _TILE_STATE
+    bounds, core = spec
+    halo, _, pos, _, dist = tile_neighbors(st["coords"], bounds, core, st["k"], st["halo"])
+    w = kernel_weights(dist[pos])
+    return halo, int((w != 0).sum(axis=1).max())
+
+
+def _tile_stats(spec):
+    """2단계: 타일 핵심 지점의 통계량·순열 p-value (전체 y와 전역 요약값 사용)."""
+    st = _TILE_STATE
+    bounds, core, halo = spec
+    _, tile, pos, idx, dist = tile_neighbors(st["coords"], bounds, core, st["k"], halo)
+    csr = neighbor_arrays_to_csr(idx, kernel_weights(dist))
+
+    y = st["y"]
+    obs, a, b, parts = local_stat_terms(y[tile], WSP(csr), st["stats"], st["moments"])
+    _, w_other = split_self_weights(csr, width=st["width"])
+    obs, a, b, w_other = obs[pos], a[pos], b[pos], w_other[pos]
+    parts = {name: arr[pos] for name, arr in parts.items()}
+
+    n_perm = None
+    if st["adaptive"]:
+        p_sim, n_perm = crand_sequential(
+            y, w_other, obs, a, b, permutations=st["permutations"], seed=st["seed"],
+            workers=1, alpha=ALPHA, confidence=EARLY_STOP_CONFIDENCE, gid=core)
+    else:
+        p_sim = crand_p_sim(y, w_other, obs, a, b, permutations=st["permutations"],
+                            seed=st["seed"], workers=1, gid=core)
+    p_sim[~(w_other > 0).any(axis=1)] = np.nan
+    return core, parts, p_sim, n_perm
+
+
+def assign_local_stats_tiled(frame: pd.DataFrame, value_cols, coords: np.ndarray,
+                             k=K_NEIGHBORS, stats=("gi", "lisa"), prefixes=None,
+                             tile_size=TILE_SIZE_M, halo=TILE_HALO_M, permutations=999,
+                             seed=1234, workers=1, adaptive=False) -> pd.DataFrame:
+    """
+    assign_local_stats(KNN bi-square 가중치)의 타일 실행 버전 — 결과 컬럼·값이 같다.
+    coords: frame 행 순서의 투영 좌표 (n, 2). 타일 단위로 프로세스에 분배.
+    """
+    value_cols = list(value_cols)
+    prefixes = [c.lower() for c in value_cols] if prefixes is None else list(prefixes)
+    stats = list(stats)
+    y = frame[value_cols].apply(pd.to_numeric, errors="coerce").fillna(0)\
+        .astype("float64").values
+    coords = np.ascontiguousarray(coords, dtype="float64")
+
+    tiles = make_tiles(coords, tile_size)
+    state = dict(coords=coords, y=y, moments=global_moments(y), k=k, halo=halo,
+                 stats=stats, permutations=permutations, seed=seed, adaptive=adaptive)
+    with _tile_pool(state, workers, len(tiles)) as ex:
+        # 1단계: 타일별 halo 확정 + 전체 그래프 기준 순열 폭(0 아닌 이웃 수 최대)
+        widths = _map(ex, _tile_width, tiles)
+    # 2단계 풀은 이 폭이 담긴 state로 다시 초기화된다
+    state["width"] = max(1, max(w for _, w in widths))
+    print(f"타일 {len(tiles):,}개 (한 변 {tile_size:,.0f}m), 최대 halo {max(h for h, _ in widths):,.0f}m")
+
+    specs = [(bounds, core, h) for (bounds, core), (h, _) in zip(tiles, widths)]
+    with _tile_pool(state, workers, len(tiles)) as ex:
+        results = _map(ex, _tile_stats, specs)
+
+    n, n_cols = len(y), len(stats) * len(value_cols)
+    p_sim = np.empty((n, n_cols))
+    n_perm = np.empty((n, n_cols), dtype=np.int64) if adaptive else None
+    parts = {}
+    for core, tile_parts, p, used in results:
+        p_sim[core] = p
+        if adaptive:
+            n_perm[core] = used
+        for name, arr in tile_parts.items():
+            parts.setdefault(name, np.empty((n, arr.shape[1])))[core] = arr
+    return write_local_stats(frame, stats, prefixes, parts, p_sim, n_perm)
@@ -0,0 +1,194 @@
+"""
+분석 결과 컬럼형 저장/로드 (GeoParquet · Parquet · Feather)
+- CSV/GeoJSON 옆에 타입이 지정된 컬럼형 파일을 같이 저장해, 지도 내보내기·노트북에서
+  텍스트 재파싱 없이 바로 읽는다
+- 타입: 실수 → float32 (lat/lon/x/y는 float64 유지: float32면 약 1 m 오차), 정수 → int32,
+  라벨 문자열 → category
+- .parquet: GeoDataFrame이면 GeoParquet(WKB geometry + CRS 메타), 아니면 lon/lat 컬럼 Parquet
+- .feather: 비압축 Arrow IPC — 메모리 맵으로 열면 숫자 컬럼은 복사 없이(zero-copy) 읽힌다
+- 점 GeoJSON / NDJSON 스트리밍 저장: lon/lat·속성 배열을 청크 단위 문자열 연산으로 바로 기록
+  (지점별 shapely 객체·OGR 드라이버 없이, 메모리는 청크 크기만큼만 사용)
+사용:
+    from result_io import write_columnar, read_columnar, read_arrow, write_points_geojson
+    write_columnar(gdf, "suwon_hotspots_gi.parquet")
+    gdf = read_columnar("suwon_hotspots_gi.parquet")
+    write_points_geojson(gdf[["lat", "lon", "amt_z"]], "suwon_hotspots_gi_unified.geojson")
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+# float32로 줄이지 않는 좌표 컬럼
+COORD_COLUMNS = ("lat", "lon", "x", "y")
+
+# GeoJSON 좌표 소수 자릿수 (6자리 ≈ 0.1 m) / 한 번에 문자열로 만드는 지점 수
+GEOJSON_PRECISION = 6
+GEOJSON_CHUNK = 50_000
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("컬럼형 출력에는 pyarrow가 필요합니다: pip install pyarrow") from e
+
+
+def typed_columns(frame: pd.DataFrame, keep_float64=COORD_COLUMNS) -> pd.DataFrame:
+    """
+    저장용 타입 축소 사본: float64 → float32, int64 → int32 (널 허용 Int64/Float64 → Int32/Float32), 문자열 → category.
+    keep_float64 컬럼은 float64 그대로, geometry 컬럼은 건드리지 않는다.
+    """
+    out = frame.copy()
+    for c in out.columns:
+        if c == getattr(frame, "_geometry_column_name", None) or c in keep_float64:
+            continue
+        s = out[c]
+        # 널 허용 확장 타입(Int64 / Float64)은 NA를 유지하도록 같은 계열의 확장 타입으로 축소
+        nullable = isinstance(s.dtype, pd.api.extensions.ExtensionDtype)
+        if pd.api.types.is_float_dtype(s):
+            out[c] = s.astype("Float32" if nullable else np.float32)
+        elif pd.api.types.is_integer_dtype(s):
+            if s.isna().all() or (s.min() >= np.iinfo(np.int32).min and s.max() <= np.iinfo(np.int32).max):
+                out[c] = s.astype("Int32" if nullable else np.int32)
+        elif pd.api.types.is_string_dtype(s) or s.dtype == object:
+            out[c] = s.astype("category")
+    return out
+
+
+def write_columnar(frame: pd.DataFrame, path: str, keep_float64=COORD_COLUMNS) -> str:
+    """
+    확장자로 형식 결정 (.parquet / .feather). 인덱스는 저장하지 않는다.
+    Feather는 geometry를 빼고 lon/lat만 저장 (Arrow에 geometry 타입이 없으므로).
+    """
+    _require_pyarrow()
+    typed = typed_columns(frame, keep_float64)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        if isinstance(typed, gpd.GeoDataFrame):
+            typed.reset_index(drop=True).to_parquet(path, index=False)
+        else:
+            pd.DataFrame(typed).to_parquet(path, index=False)
+    elif ext in (".feather", ".arrow"):
+        if isinstance(typed, gpd.GeoDataFrame):
+            typed = pd.DataFrame(typed.drop(columns=typed.geometry.name))
+        typed.reset_index(drop=True).to_feather(path, compression="uncompressed")
+    else:
+        raise ValueError(f"지원하지 않는 컬럼형 형식: {path} (.parquet/.feather)")
+    return path
+
+
+def read_arrow(path: str, columns=None):
+    """
+    pyarrow.Table로 읽기. Feather는 메모리 맵(zero-copy), Parquet은 필요한 컬럼만 읽음.
+    """
+    _require_pyarrow()
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".feather", ".arrow"):
+        import pyarrow.feather as feather
+        return feather.read_table(path, columns=columns, memory_map=True)
+    import pyarrow.parquet as pq
+    return pq.read_table(path, columns=columns)
+
+
+def read_columnar(path: str, columns=None, geometry=True) -> pd.DataFrame:
+    """
+    write_columnar 산출물 → DataFrame / GeoDataFrame.
+    - GeoParquet: GeoDataFrame (CRS 포함, columns 지정 시 geometry 자동 포함)
+    - 그 외: geometry=True이고 lon/lat 컬럼이 있으면 점 GeoDataFrame(EPSG:4326)으로 변환
+    geometry=False면 좌표 변환 없이 속성 DataFrame만 반환.
+    """
+    _require_pyarrow()
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path)
+        if b"geo" in (schema.metadata or {}):
+            geom_cols = [f.name for f in schema if f.name == "geometry"]
+            if geometry:
+                cols = None if columns is None else list(dict.fromkeys(list(columns) + geom_cols))
+                return gpd.read_parquet(path, columns=cols)
+            cols = [f.name for f in schema if f.name not in geom_cols] if columns is None \
+                else list(columns)
+            return pd.read_parquet(path, columns=cols)
+
+    df = read_arrow(path, columns=columns).to_pandas()
+    if geometry and {"lon", "lat"} <= set(df.columns):
+        return gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df["lon"], df["lat"]),
+                                crs="EPSG:4326")
+    return df
+
+
+def _json_column(values, float_precision=None) -> list:
+    """
+    속성 컬럼 → JSON 값 문자열 리스트. 결측·inf → null.
+    숫자는 배열을 한 번에 파이썬 값으로 바꿔 repr, 문자열/범주는 고유값만 json.dumps 후 코드로 펼친다.
+    """
+    s = pd.Series(values)
+    if pd.api.types.is_bool_dtype(s) and not s.isna().any():
+        return np.where(s.to_numpy(bool), "true", "false").tolist()
+    if pd.api.types.is_integer_dtype(s) or pd.api.types.is_float_dtype(s):
+        na = s.isna().to_numpy()
+        if pd.api.types.is_integer_dtype(s):
+            out = list(map(str, s.fillna(0).to_numpy(np.int64).tolist()))
+        else:
+            v = s.to_numpy("float64")
+            if float_precision is not None:
+                v = np.round(v, float_precision)
+            out = list(map(repr, v.tolist()))
+            na = na | ~np.isfinite(v)
+        for i in np.flatnonzero(na):
+            out[i] = "null"
+        return out
+    codes, uniques = pd.factorize(s)
+    enc = np.array([json.dumps(u.item() if isinstance(u, np.generic) else u,
+                               ensure_ascii=False, default=str) for u in uniques] + ["null"],
+                   dtype=object)
+    return enc[codes].tolist()
+
+
+def write_geojson(path: str, lon, lat, properties=None, precision=GEOJSON_PRECISION,
+                  float_precision=None, ndjson=False, chunk=GEOJSON_CHUNK, name=None) -> str:
+    """
+    점 FeatureCollection GeoJSON (ndjson=True면 한 줄에 Feature 하나인 NDJSON) 스트리밍 저장.
+    lon, lat: (n,) 배열 (WGS84), properties: DataFrame 또는 {컬럼명: (n,) 배열}
+    precision: 좌표 소수 자릿수, float_precision: 실수 속성 반올림 자릿수 (None이면 그대로)
+    청크마다 컬럼별 JSON 조각을 만든 뒤 Feature 템플릿 하나에 % 치환 → 지오메트리 객체 없음.
+    """
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    props = pd.DataFrame(properties if properties is not None else {})
+    keys = [json.dumps(str(c), ensure_ascii=False).replace("%", "%%") for c in props.columns]
+    template = ('{"type": "Feature", "properties": {' + ", ".join(k + ": %s" for k in keys) +
+                '}, "geometry": {"type": "Point", "coordinates": [%s, %s]}}')
+    sep = "\n" if ndjson else ",\n"
+
+    with open(path, "w", encoding="utf-8") as f:
+        if not ndjson:
+            head = {"type": "FeatureCollection"}
+            if name is not None:
+                head["name"] = name
+            f.write(json.dumps(head, ensure_ascii=False)[:-1] + ', "features": [\n')
+        for s in range(0, len(lon), chunk):
+            e = min(s + chunk, len(lon))
+            cols = [_json_column(props[c].iloc[s:e], float_precision) for c in props.columns]
+            cols += [_json_column(lon[s:e], precision), _json_column(lat[s:e], precision)]
+            if s:
+                f.write(sep)
+            f.write(sep.join(template % row for row in zip(*cols)))
+        f.write("\n" if ndjson else "\n]}\n")
+    return path
+
+
+def write_points_geojson(frame: pd.DataFrame, path: str, lon_col="lon", lat_col="lat",
+                         **kwargs) -> str:
+    """
+    lon/lat 컬럼이 있는 표 → 점 GeoJSON (geometry 컬럼은 속성에서 제외, 좌표는 lon/lat 컬럼 사용).
+    확장자가 .ndjson/.geojsonl이면 NDJSON. 나머지 인자는 write_geojson과 같다.
+    """
+    geom = getattr(frame, "_geometry_column_name", None)
+    props = frame.drop(columns=[geom]) if geom in frame.columns else frame
+    kwargs.setdefault("ndjson", os.path.splitext(path)[1].lower() in (".ndjson", ".geojsonl"))
+    kwargs.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return write_geojson(path, frame[lon_col].to_numpy(), frame[lat_col].to_numpy(), props,
+                         **kwargs)
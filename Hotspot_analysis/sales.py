@@ -1,57 +1,56 @@
 import pandas as pd
 import numpy as np
 import geopandas as gpd
-from shapely.geometry import Point
-import ast
-
-df = pd.read_csv("경기도골목상권매출_위경도(2).csv")
-
-# 숫자 변환 + 좌표 NaN 제거
-for c in ["AMT","NOC","lat","lon"]:
-    if c in df.columns:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-df = df.dropna(subset=["lat","lon"]).copy()
-
-# meta에서 address_name 추출
-def extract_addr(s):
-    try:
-        d = ast.literal_eval(s) if isinstance(s, str) else {}
-        return d.get("address_name")
-    except Exception:
-        return None
-
-df["addr_name"] = df["meta"].apply(extract_addr)
-
-# 🚩 여기서 '수원시' 포함된 행만 필터링
-df = df[df["addr_name"].str.contains("수원시", na=False)].copy()
-
-# 좌표 반올림으로 같은 지점 묶기
-df["lat_r"] = df["lat"].round(5)
-df["lon_r"] = df["lon"].round(5)
-
-def make_key(row):
-    return row["addr_name"] if pd.notna(row["addr_name"]) else (row["lat_r"], row["lon_r"])
-df["addr_key"] = df.apply(make_key, axis=1)
-
-# 주소 기준 집계
-agg = (df.groupby("addr_key", as_index=False)
-         .agg(AMT_sum=("AMT","sum"),
-              AMT_mean=("AMT","mean"),
-              NOC_sum=("NOC","sum"),
-              NOC_mean=("NOC","mean"),
-              n=("AMT","size"),
-              lat=("lat","mean"),
-              lon=("lon","mean"))
+
+from hotspot import load_sales_csv
+from result_io import write_columnar, write_points_geojson
+
+# ========= 설정 =========
+INPUT_CSV = "경기도골목상권매출_위경도(2).csv"
+OUT_GEOJSON = "sales_suwon.geojson"      # 합계·평균 컬럼을 함께 담은 단일 산출물 (sales.html이 읽음)
+OUT_PARQUET = "sales_suwon.parquet"
+
+# (옵션) 보기별 경량 GeoJSON: {파일 접미어: 속성 컬럼} — 예) {"mean": ["AMT_mean", "n"]}
+#        → sales_suwon_mean.geojson (좌표 + 지정 컬럼만)
+SLIM_VIEWS = {}
+# ========================
+
+# 청크 단위 로드 + 숫자 변환 + 좌표 NaN 제거
+# 🚩 meta.address_name에 '수원시' 포함된 행만 청크마다 필터링 (BBOX 폴백 없음)
+df = load_sales_csv(INPUT_CSV, sigun="수원시", bbox=None)
+
+# 주소 키 (주소가 없으면 반올림 좌표 "(lat, lon)") — 컬럼 단위 np.where, 범주형으로 묶기
+lat_r, lon_r = df["lat"].round(5), df["lon"].round(5)
+coord_key = "(" + lat_r.astype(str) + ", " + lon_r.astype(str) + ")"
+addr = df["addr_name"] if "addr_name" in df.columns else pd.Series(np.nan, index=df.index)
+df["addr_key"] = pd.Categorical(np.where(addr.notna(), addr, coord_key))
+
+# 주소 기준 집계 (합계·평균을 한 번에)
+agg = (df.groupby("addr_key", observed=True, as_index=False)
+         .agg(AMT_sum=("AMT", "sum"),
+              AMT_mean=("AMT", "mean"),
+              NOC_sum=("NOC", "sum"),
+              NOC_mean=("NOC", "mean"),
+              n=("AMT", "size"),
+              lat=("lat", "mean"),
+              lon=("lon", "mean"))
       )
 
-# GeoDataFrame 변환
-gdf = gpd.GeoDataFrame(
-    agg,
-    geometry=[Point(xy) for xy in zip(agg["lon"], agg["lat"])],
-    crs="EPSG:4326"
-)
-
-# 저장 (수원시 데이터만)
-gdf.to_file("sales_suwon_mean.geojson", driver="GeoJSON", encoding="utf-8")
-gdf.to_file("sales_suwon_sum.geojson",  driver="GeoJSON", encoding="utf-8")
-print("✅ 수원시 필터링 완료, sales_suwon_mean.geojson / sales_suwon_sum.geojson 생성")
+# 저장 (수원시 데이터만) — 합계·평균 보기 모두 이 파일 하나를 사용
+# lat/lon 평균 컬럼에서 바로 스트리밍 저장 (점 지오메트리 객체를 만들지 않음)
+write_points_geojson(agg, OUT_GEOJSON)
+print(f"✅ 수원시 필터링 완료, {OUT_GEOJSON} 생성 (지점 {len(agg):,}개)")
+
+for view, cols in SLIM_VIEWS.items():
+    path = OUT_GEOJSON.replace(".geojson", f"_{view}.geojson")
+    write_points_geojson(agg[["lat", "lon"] + [c for c in cols if c not in ("lat", "lon")]], path)
+    print(f"✅ {path} 생성 ({', '.join(cols)})")
+
+# 컬럼형(GeoParquet) 사본 — 여기서만 점 지오메트리 생성 (벡터 생성)
+try:
+    gdf = gpd.GeoDataFrame(agg, geometry=gpd.points_from_xy(agg["lon"], agg["lat"]),
+                           crs="EPSG:4326")
+    write_columnar(gdf, OUT_PARQUET)
+    print(f"✅ {OUT_PARQUET} 생성")
+except ImportError as e:
+    print(f"⚠️ {e} — {OUT_PARQUET} 건너뜀")
@@ -5,6 +5,8 @@
 공영주차장 접근성 분석
 """
 
+import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -13,6 +15,9 @@ from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from parking_access import load_nearest_lots, nearest_lot_frame, weighted_describe
+
 # 한글 폰트 설정
 plt.rcParams['font.family'] = 'DejaVu Sans'
 plt.rcParams['axes.unicode_minus'] = False
@@ -21,23 +26,32 @@ def load_cleaned_data():
     """정리된 데이터 로드"""
     print("정리된 데이터 로딩 중...")
     
-    violations_df = pd.read_csv('../data/정리된_주차단속데이터.csv', encoding='utf-8-sig')
     parking_df = pd.read_csv('../data/정리된_공영주차장데이터.csv', encoding='utf-8-sig')
-    distance_df = pd.read_csv('../data/거리매트릭스.csv', encoding='utf-8-sig')
+    locations_df = pd.read_csv('../data/단속장소_집계.csv', encoding='utf-8-sig')
+    
+    # 장소별 최근접 공영주차장 거리표 (행 = loc_id, 단속건수는 단속 건 기준 통계의 가중치)
+    dist_m, lot, lots = load_nearest_lots('../data/최근접_공영주차장.npz')
+    distance_df = nearest_lot_frame(locations_df, dist_m, lot, lots)
+    
+    # 최근접 주차장 특성: 주차구획수 (주차장 조회표), 기본요금 (정리된 공영주차장 데이터)
+    capacity = lots['주차구획수'] if '주차구획수' in lots.columns else pd.Series(np.nan, index=lots.index)
+    distance_df['주차구획수'] = capacity.reindex(lot[:, 0]).to_numpy('float64')
+    fee = parking_df.drop_duplicates('주차장명').set_index('주차장명')['기본요금']
+    distance_df['기본요금'] = distance_df['공영주차장'].map(fee)
     
-    print(f"주차단속 데이터: {len(violations_df):,}건")
+    print(f"주차단속 데이터: {locations_df['단속건수'].sum():,}건")
     print(f"공영주차장 데이터: {len(parking_df):,}건")
-    print(f"거리매트릭스: {len(distance_df):,}건")
+    print(f"단속장소: {len(locations_df):,}개")
     
-    return violations_df, parking_df, distance_df
+    return locations_df, parking_df, distance_df
 
 def analyze_parking_accessibility(distance_df):
     """공영주차장 접근성 분석"""
     print("\n=== 공영주차장 접근성 분석 ===")
     
-    # 거리별 분포 분석
+    # 거리별 분포 분석 (단속 건 기준 — 장소별 거리를 단속건수로 가중)
     print("거리별 분포:")
-    print(distance_df['거리_km'].describe())
+    print(weighted_describe(distance_df, '거리_km'))
     
     # 거리 구간별 분류
     distance_df['거리구간'] = pd.cut(distance_df['거리_km'], 
@@ -45,45 +59,44 @@ def analyze_parking_accessibility(distance_df):
                                    labels=['0.5km이내', '0.5~1km', '1~2km', '2km이상'])
     
     # 거리 구간별 단속 건수
-    distance_distribution = distance_df['거리구간'].value_counts().sort_index()
+    distance_distribution = distance_df.groupby('거리구간', observed=False)['단속건수'].sum()
     print("\n거리 구간별 단속 건수:")
     print(distance_distribution)
     
     return distance_df
 
-def analyze_hotspots_by_distance(violations_df, distance_df):
+def analyze_hotspots_by_distance(distance_df):
     """거리별 핫스팟 분석"""
     print("\n=== 거리별 핫스팟 분석 ===")
     
-    # 거리별 단속 빈도 분석
-    distance_violations = distance_df.groupby('거리구간').agg({
-        '거리_km': 'count',
-        '주차구획수': 'mean',
-        '기본요금': 'mean'
-    }).rename(columns={'거리_km': '단속건수'})
+    # 거리별 단속 빈도 분석 (단속건수 합, 최근접 주차장 특성은 단속 건 가중 평균)
+    distance_violations = pd.DataFrame({
+        '단속건수': distance_df.groupby('거리구간', observed=False)['단속건수'].sum(),
+        '주차구획수': weighted_describe(distance_df, '주차구획수', by='거리구간')['mean'],
+        '기본요금': weighted_describe(distance_df, '기본요금', by='거리구간')['mean']
+    })
     
     print("거리별 단속 패턴:")
     print(distance_violations)
     
-    # 거리와 단속 빈도의 상관관계
+    # 거리와 주차구획수의 상관관계 (단속장소 기준)
     correlation = distance_df['거리_km'].corr(distance_df['주차구획수'])
     print(f"\n거리와 주차구획수의 상관계수: {correlation:.3f}")
     
     return distance_violations
 
-def analyze_time_patterns_by_distance(violations_df, distance_df):
+def analyze_time_patterns_by_distance(locations_df, distance_df):
     """거리별 시간대 패턴 분석"""
     print("\n=== 거리별 시간대 패턴 분석 ===")
     
-    # 거리와 시간대 결합 분석
-    time_distance_analysis = violations_df.merge(
-        distance_df[['단속장소', '거리구간']], 
-        on='단속장소', 
-        how='inner'
-    )
+    # 장소별 시간대 건수(시간_{hour}, 01 집계표)를 거리구간별로 합산 — 단속 건 원자료 불필요
+    # (distance_df와 locations_df는 같은 loc_id 행 순서)
+    hour_counts = locations_df.filter(regex=r'^시간_')
+    hour_counts.columns = hour_counts.columns.str[len('시간_'):].astype(int).rename('hour')
     
     # 거리 구간별 시간대 패턴
-    time_patterns = time_distance_analysis.groupby(['거리구간', 'hour']).size().unstack(fill_value=0)
+    time_patterns = hour_counts.groupby(distance_df['거리구간'].to_numpy(), observed=False).sum()
+    time_patterns.index.name = '거리구간'
     
     print("거리 구간별 시간대 패턴:")
     print(time_patterns)
@@ -94,11 +107,11 @@ def identify_parking_deserts(distance_df, threshold=2.0):
     """주차장 사각지대 식별"""
     print(f"\n=== 주차장 사각지대 식별 (기준: {threshold}km) ===")
     
-    # 사각지대 지역 식별
+    # 사각지대 지역 식별 (단속장소 단위, 단속건수 포함)
     parking_deserts = distance_df[distance_df['거리_km'] >= threshold]
     
-    print(f"주차장 사각지대 지역: {len(parking_deserts):,}건")
-    print(f"전체 대비 비율: {len(parking_deserts)/len(distance_df)*100:.1f}%")
+    print(f"주차장 사각지대 지역: {len(parking_deserts):,}개 장소 (단속 {parking_deserts['단속건수'].sum():,}건)")
+    print(f"전체 대비 비율: {parking_deserts['단속건수'].sum()/distance_df['단속건수'].sum()*100:.1f}% (단속 건 기준)")
     
     # 사각지대 지역의 특성
     desert_stats = parking_deserts.describe()
@@ -111,36 +124,19 @@ def generate_policy_recommendations(distance_df, parking_deserts):
     """정책 제안 생성"""
     print("\n=== 맞춤형 탄력주차 정책 제안 ===")
     
-    # 거리별 정책 유형 분류
-    policy_recommendations = []
-    
-    for _, row in distance_df.iterrows():
-        if row['거리_km'] <= 0.5:
-            policy = "제한적 유예 (1시간)"
-            reason = "공영주차장 매우 가까움"
-        elif row['거리_km'] <= 1.0:
-            policy = "보통 유예 (1.5시간)"
-            reason = "공영주차장 가까움"
-        elif row['거리_km'] <= 2.0:
-            policy = "확대 유예 (2시간)"
-            reason = "공영주차장 보통 거리"
-        else:
-            policy = "특별 유예 (2.5시간)"
-            reason = "주차장 사각지대"
-        
-        policy_recommendations.append({
-            '단속장소': row['단속장소'],
-            '공영주차장': row['공영주차장'],
-            '거리_km': row['거리_km'],
-            '거리구간': row['거리구간'],
-            '권장정책': policy,
-            '정책근거': reason
-        })
-    
-    policy_df = pd.DataFrame(policy_recommendations)
-    
-    # 정책별 통계
-    policy_stats = policy_df['권장정책'].value_counts()
+    # 거리별 정책 유형 분류 (단속장소 단위, 행 반복 없이 컬럼 단위로)
+    distance = distance_df['거리_km']
+    conditions = [distance <= 0.5, distance <= 1.0, distance <= 2.0]
+    
+    policy_df = distance_df[['loc_id', '단속장소', '단속건수', '공영주차장', '거리_km', '거리구간']].assign(
+        권장정책=np.select(conditions, ["제한적 유예 (1시간)", "보통 유예 (1.5시간)", "확대 유예 (2시간)"],
+                        default="특별 유예 (2.5시간)"),
+        정책근거=np.select(conditions, ["공영주차장 매우 가까움", "공영주차장 가까움", "공영주차장 보통 거리"],
+                        default="주차장 사각지대")
+    ).reset_index(drop=True)
+    
+    # 정책별 통계 (단속 건 기준)
+    policy_stats = policy_df.groupby('권장정책')['단속건수'].sum().sort_values(ascending=False)
     print("권장 정책별 건수:")
     print(policy_stats)
     
@@ -168,16 +164,16 @@ def main():
     print("공영주차장 접근성 분석 시작\n")
     
     # 데이터 로드
-    violations_df, parking_df, distance_df = load_cleaned_data()
+    locations_df, parking_df, distance_df = load_cleaned_data()
     
     # 공영주차장 접근성 분석
     distance_df = analyze_parking_accessibility(distance_df)
     
     # 거리별 핫스팟 분석
-    distance_violations = analyze_hotspots_by_distance(violations_df, distance_df)
+    distance_violations = analyze_hotspots_by_distance(distance_df)
     
     # 거리별 시간대 패턴 분석
-    time_patterns = analyze_time_patterns_by_distance(violations_df, distance_df)
+    time_patterns = analyze_time_patterns_by_distance(locations_df, distance_df)
     
     # 주차장 사각지대 식별
     parking_deserts = identify_parking_deserts(distance_df)
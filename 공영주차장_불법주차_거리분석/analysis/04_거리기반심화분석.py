@@ -5,13 +5,17 @@
 거리 기반 심화 분석
 """
 
+import os
+import sys
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from parking_access import load_nearest_lots, nearest_lot_frame, weighted_describe
+
 # Pretendard 폰트 설정
 plt.rcParams['font.family'] = 'Pretendard'
 plt.rcParams['axes.unicode_minus'] = False
@@ -20,27 +24,36 @@ def load_data():
     """데이터 로드"""
     print("거리 기반 심화 분석을 위한 데이터 로딩 중...")
     
-    # 거리 매트릭스 데이터 로드
-    distance_df = pd.read_csv('data/거리매트릭스.csv', encoding='utf-8-sig')
+    # 고유 단속장소 집계 로드 (단속건수 등, loc_id = 행 번호)
+    locations_df = pd.read_csv('data/단속장소_집계.csv', encoding='utf-8-sig')
     
-    # 주차단속 데이터 로드
-    violations_df = pd.read_csv('data/정리된_주차단속데이터.csv', encoding='utf-8-sig')
+    # 장소별 최근접 공영주차장 거리표 (행 = loc_id, 단속건수는 단속 건 기준 통계의 가중치)
+    nearest = load_nearest_lots('data/최근접_공영주차장.npz')
+    distance_df = nearest_lot_frame(locations_df, *nearest)
     
     # 공영주차장 위경도 데이터 로드
     parking_coords = pd.read_csv('data/공영주차장_위경도.csv', encoding='utf-8-sig')
     
-    print(f"거리 매트릭스: {len(distance_df):,}건")
-    print(f"주차단속 데이터: {len(violations_df):,}건")
+    print(f"고유 단속장소: {len(locations_df):,}개 (단속 {locations_df['단속건수'].sum():,}건)")
     print(f"공영주차장 위경도: {len(parking_coords):,}건")
     
-    return distance_df, violations_df, parking_coords
+    return distance_df, locations_df, parking_coords
+
+def group_distance_stats(distance_df, by, stats):
+    """그룹별 단속 건 기준 거리 통계(count = 단속 건수) + 고유 단속장소 수 — 열: ('거리_km', 통계), ('단속장소', 'nunique')"""
+    distance = weighted_describe(distance_df, '거리_km', by=by)[stats]
+    locations = distance_df.groupby(by, observed=False)['단속장소'].nunique().to_frame('nunique')
+    stats_df = pd.concat({'거리_km': distance, '단속장소': locations}, axis=1).round(2)
+    if 'count' in stats:
+        stats_df[('거리_km', 'count')] = stats_df[('거리_km', 'count')].astype('int64')
+    return stats_df
 
 def analyze_distance_patterns(distance_df):
     """거리 패턴 심화 분석"""
     print("\n=== 📊 거리 패턴 심화 분석 ===")
     
-    # 1. 거리 통계
-    distance_stats = distance_df['거리_km'].describe()
+    # 1. 거리 통계 (단속 건 기준 — 장소별 거리를 단속건수로 가중)
+    distance_stats = weighted_describe(distance_df, '거리_km')
     print("\n1️⃣ 거리 통계:")
     print(f"   평균 거리: {distance_stats['mean']:.2f}km")
     print(f"   중간값 거리: {distance_stats['50%']:.2f}km")
@@ -54,19 +67,13 @@ def analyze_distance_patterns(distance_df):
                                   bins=[0, 0.5, 1, 2, 3, 5, 10], 
                                   labels=['0.5km이내', '0.5-1km', '1-2km', '2-3km', '3-5km', '5km이상'])
     
-    distance_analysis = distance_df.groupby('거리구간').agg({
-        '거리_km': ['count', 'mean', 'std'],
-        '단속장소': 'nunique'
-    }).round(2)
+    distance_analysis = group_distance_stats(distance_df, '거리구간', ['count', 'mean', 'std'])
     
     print(distance_analysis)
     
     # 3. 공영주차장별 접근성 분석
     print("\n3️⃣ 공영주차장별 접근성 분석:")
-    parking_analysis = distance_df.groupby('공영주차장').agg({
-        '거리_km': ['count', 'mean', 'min', 'max'],
-        '단속장소': 'nunique'
-    }).round(2)
+    parking_analysis = group_distance_stats(distance_df, '공영주차장', ['count', 'mean', 'min', 'max'])
     
     # 상위 10개 공영주차장 (단속 건수 기준)
     top_parking = parking_analysis[('거리_km', 'count')].sort_values(ascending=False).head(10)
@@ -78,16 +85,12 @@ def analyze_distance_patterns(distance_df):
     
     return distance_analysis, parking_analysis
 
-def analyze_hotspots_by_distance(distance_df, violations_df):
+def analyze_hotspots_by_distance(distance_df):
     """거리별 핫스팟 분석"""
     print("\n=== 🔥 거리별 핫스팟 분석 ===")
     
-    # 단속장소별 단속 건수 계산
-    violation_counts = violations_df['단속장소'].value_counts().reset_index()
-    violation_counts.columns = ['단속장소', '단속건수']
-    
-    # 거리 데이터와 병합
-    distance_violations = distance_df.merge(violation_counts, on='단속장소', how='left')
+    # 단속장소별 단속 건수는 장소별 거리표의 단속건수 컬럼 (장소당 1행 — 집계·상관은 장소 단위)
+    distance_violations = distance_df.copy()
     
     # 거리 구간별 핫스팟 분석
     print("\n1️⃣ 거리 구간별 핫스팟:")
@@ -125,11 +128,11 @@ def analyze_parking_deserts(distance_df, parking_coords):
     parking_deserts = distance_df[distance_df['거리_km'] >= desert_threshold]
     
     print(f"\n1️⃣ 주차장 사각지대 현황 (2km 이상):")
-    print(f"   사각지대 단속 건수: {len(parking_deserts):,}건")
-    print(f"   전체 대비 비율: {len(parking_deserts)/len(distance_df)*100:.1f}%")
+    print(f"   사각지대 단속 건수: {parking_deserts['단속건수'].sum():,}건")
+    print(f"   전체 대비 비율: {parking_deserts['단속건수'].sum()/distance_df['단속건수'].sum()*100:.1f}%")
     
-    # 2. 사각지대 거리 분포
-    desert_stats = parking_deserts['거리_km'].describe()
+    # 2. 사각지대 거리 분포 (단속 건 기준)
+    desert_stats = weighted_describe(parking_deserts, '거리_km')
     print(f"\n2️⃣ 사각지대 거리 통계:")
     print(f"   평균 거리: {desert_stats['mean']:.2f}km")
     print(f"   중간값 거리: {desert_stats['50%']:.2f}km")
@@ -145,7 +148,7 @@ def analyze_parking_deserts(distance_df, parking_coords):
     
     return parking_deserts
 
-def create_distance_based_policy(distance_df, violations_df):
+def create_distance_based_policy(distance_df, locations_df):
     """거리 기반 정책 제안"""
     print("\n=== 🎯 거리 기반 정책 제안 ===")
     
@@ -194,10 +197,7 @@ def create_distance_based_policy(distance_df, violations_df):
                                   bins=[0, 0.5, 1, 2, 3, 5, 10], 
                                   labels=['0.5km이내', '0.5-1km', '1-2km', '2-3km', '3-5km', '5km이상'])
     
-    distance_stats = distance_df.groupby('거리구간').agg({
-        '거리_km': ['count', 'mean'],
-        '단속장소': 'nunique'
-    }).round(2)
+    distance_stats = group_distance_stats(distance_df, '거리구간', ['count', 'mean'])
     
     print("\n1️⃣ 거리별 맞춤형 정책 매트릭스:")
     print("=" * 100)
@@ -236,7 +236,7 @@ def create_enhanced_visualizations(distance_df, distance_violations, parking_des
     distance_df['거리구간'] = pd.cut(distance_df['거리_km'], 
                                   bins=[0, 0.5, 1, 2, 3, 5, 10], 
                                   labels=['0.5km이내', '0.5-1km', '1-2km', '2-3km', '3-5km', '5km이상'])
-    distance_counts = distance_df.groupby('거리구간').size()
+    distance_counts = distance_df.groupby('거리구간', observed=False)['단속건수'].sum()
     distance_counts.plot(kind='bar', color='#FF6B6B', edgecolor='darkred', linewidth=1.5)
     plt.title('거리 구간별 단속 건수', fontsize=14, fontweight='bold')
     plt.xlabel('거리 구간', fontsize=12)
@@ -259,7 +259,8 @@ def create_enhanced_visualizations(distance_df, distance_violations, parking_des
     
     # 4. 사각지대 분포
     plt.subplot(2, 3, 4)
-    plt.hist(parking_deserts['거리_km'], bins=20, color='#FFEAA7', alpha=0.7, edgecolor='#DDA0DD', linewidth=1)
+    plt.hist(parking_deserts['거리_km'], bins=20, weights=parking_deserts['단속건수'],
+             color='#FFEAA7', alpha=0.7, edgecolor='#DDA0DD', linewidth=1)
     plt.axvline(x=2.0, color='red', linestyle='--', label='사각지대 기준 (2km)')
     plt.title('주차장 사각지대 거리 분포', fontsize=14, fontweight='bold')
     plt.xlabel('거리 (km)', fontsize=12)
@@ -269,8 +270,9 @@ def create_enhanced_visualizations(distance_df, distance_violations, parking_des
     
     # 5. 거리별 누적 분포
     plt.subplot(2, 3, 5)
-    sorted_distances = np.sort(distance_df['거리_km'])
-    cumulative = np.arange(1, len(sorted_distances) + 1) / len(sorted_distances)
+    by_distance = distance_df.sort_values('거리_km')
+    sorted_distances = by_distance['거리_km']
+    cumulative = by_distance['단속건수'].cumsum() / by_distance['단속건수'].sum()
     plt.plot(sorted_distances, cumulative, color='#96CEB4', linewidth=2)
     plt.axhline(y=0.5, color='red', linestyle='--', alpha=0.7, label='50%')
     plt.axhline(y=0.8, color='orange', linestyle='--', alpha=0.7, label='80%')
@@ -311,9 +313,10 @@ def generate_comprehensive_report(distance_analysis, parking_analysis, hotspot_a
     # 1. 핵심 통계 요약
     print("\n1️⃣ 핵심 통계 요약")
     print("=" * 60)
-    print(f"총 분석 건수: {len(distance_analysis):,}건")
+    total_count = distance_analysis[('거리_km', 'count')].sum()
+    print(f"총 분석 건수: {total_count:,}건")
     print(f"평균 접근 거리: {distance_analysis['거리_km']['mean'].mean():.2f}km")
-    print(f"사각지대 비율: {len(parking_deserts)/len(distance_analysis)*100:.1f}%")
+    print(f"사각지대 비율: {parking_deserts['단속건수'].sum()/total_count*100:.1f}%")
     print(f"공영주차장 수: {len(parking_analysis)}개")
     
     # 2. 거리별 정책 효과 예측
@@ -396,19 +399,19 @@ def main():
     print("거리 기반 심화 분석 시작\n")
     
     # 데이터 로드
-    distance_df, violations_df, parking_coords = load_data()
+    distance_df, locations_df, parking_coords = load_data()
     
     # 거리 패턴 분석
     distance_analysis, parking_analysis = analyze_distance_patterns(distance_df)
     
     # 핫스팟 분석
-    distance_violations, hotspot_analysis = analyze_hotspots_by_distance(distance_df, violations_df)
+    distance_violations, hotspot_analysis = analyze_hotspots_by_distance(distance_df)
     
     # 사각지대 분석
     parking_deserts = analyze_parking_deserts(distance_df, parking_coords)
     
     # 거리 기반 정책 제안
-    distance_policy, distance_stats = create_distance_based_policy(distance_df, violations_df)
+    distance_policy, distance_stats = create_distance_based_policy(distance_df, locations_df)
     
     # 향상된 시각화 생성
     create_enhanced_visualizations(distance_df, distance_violations, parking_deserts)
@@ -5,6 +5,8 @@
 올바른 거리 분석 (최단 거리 기준)
 """
 
+import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -12,6 +14,9 @@ import seaborn as sns
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from parking_access import load_nearest_lots, nearest_lot_frame
+
 # Pretendard 폰트 설정
 plt.rcParams['font.family'] = 'Pretendard'
 plt.rcParams['axes.unicode_minus'] = False
@@ -20,28 +25,25 @@ def load_data():
     """데이터 로드"""
     print("올바른 거리 분석을 위한 데이터 로딩 중...")
     
-    # 거리 매트릭스 데이터 로드
-    distance_df = pd.read_csv('data/거리매트릭스.csv', encoding='utf-8-sig')
+    # 고유 단속장소 집계 로드 (단속건수, loc_id = 행 번호)
+    locations_df = pd.read_csv('data/단속장소_집계.csv', encoding='utf-8-sig')
     
-    # 주차단속 데이터 로드
-    violations_df = pd.read_csv('data/정리된_주차단속데이터.csv', encoding='utf-8-sig')
+    # 장소별 최근접 공영주차장 k개 (01에서 장소당 한 번 계산, 행 = loc_id)
+    nearest = load_nearest_lots('data/최근접_공영주차장.npz')
     
-    print(f"원본 거리 매트릭스: {len(distance_df):,}건")
-    print(f"주차단속 데이터: {len(violations_df):,}건")
+    print(f"고유 단속장소: {len(locations_df):,}개 (최근접 공영주차장 {nearest[1].shape[1]}개씩)")
+    print(f"주차단속 데이터: {locations_df['단속건수'].sum():,}건")
     
-    return distance_df, violations_df
+    return locations_df, nearest
 
-def calculate_minimum_distances(distance_df):
+def calculate_minimum_distances(locations_df, nearest):
     """각 단속장소에서 가장 가까운 공영주차장까지의 거리 계산"""
     print("\n=== 📏 최단 거리 계산 ===")
     
-    # 각 단속장소별로 가장 가까운 공영주차장 찾기
-    min_distances = distance_df.groupby('단속장소').agg({
-        '거리_km': 'min',
-        '공영주차장': lambda x: x.iloc[x.index.get_loc(x.index[x == x.min()][0])] if len(x) > 0 else None
-    }).reset_index()
-    
-    min_distances.columns = ['단속장소', '최단거리_km', '가장가까운공영주차장']
+    # 최근접 산출물의 첫 번째 열이 최단 거리 (groupby 불필요)
+    min_distances = nearest_lot_frame(locations_df, *nearest)[
+        ['loc_id', '단속장소', '거리_km', '공영주차장', '단속건수']].rename(
+        columns={'거리_km': '최단거리_km', '공영주차장': '가장가까운공영주차장'})
     
     print(f"고유 단속장소 수: {len(min_distances):,}개")
     print(f"평균 최단 거리: {min_distances['최단거리_km'].mean():.2f}km")
@@ -78,16 +80,41 @@ def analyze_distance_patterns(min_distances):
     
     return distance_analysis, parking_deserts
 
-def analyze_violations_by_distance(min_distances, violations_df):
+def analyze_radius_access(locations_df):
+    """반경별 공영주차장 접근성 분석 (01에서 계산한 주차장수_{r}m / 주차구획수_{r}m 컬럼)"""
+    print("\n=== 📍 반경별 공영주차장 접근성 ===")
+    
+    radii = [int(c[len('주차장수_'):-1]) for c in locations_df.columns if c.startswith('주차장수_')]
+    if not radii:
+        print("반경별 접근성 컬럼이 없습니다. 01_데이터전처리.py를 다시 실행하세요.")
+        return None
+    
+    total = locations_df['단속건수'].sum()
+    rows = []
+    for r in radii:
+        no_lot = locations_df[f'주차장수_{r}m'] == 0
+        capacity_col = f'주차구획수_{r}m'
+        rows.append({
+            '반경': f'{r}m',
+            '평균주차장수': locations_df[f'주차장수_{r}m'].mean(),
+            '평균주차구획수': locations_df[capacity_col].mean() if capacity_col in locations_df else np.nan,
+            '사각지대_단속장소': int(no_lot.sum()),
+            '사각지대_장소비율': no_lot.mean() * 100,
+            '사각지대_단속비율': locations_df.loc[no_lot, '단속건수'].sum() / total * 100
+        })
+    radius_access = pd.DataFrame(rows).set_index('반경').round(2)
+    
+    print("\n반경 안에 공영주차장이 없는 단속장소 (사각지대):")
+    print(radius_access)
+    
+    return radius_access
+
+def analyze_violations_by_distance(min_distances):
     """거리별 단속 건수 분석"""
     print("\n=== 🔥 거리별 단속 건수 분석 ===")
     
-    # 단속장소별 단속 건수 계산
-    violation_counts = violations_df['단속장소'].value_counts().reset_index()
-    violation_counts.columns = ['단속장소', '단속건수']
-    
-    # 거리 데이터와 병합
-    distance_violations = min_distances.merge(violation_counts, on='단속장소', how='left')
+    # 단속장소별 단속 건수는 집계표의 단속건수 컬럼 (value_counts + merge 불필요)
+    distance_violations = min_distances.copy()
     
     # 거리 구간별 단속 건수 분석
     distance_violations['거리구간'] = pd.cut(distance_violations['최단거리_km'], 
@@ -317,16 +344,23 @@ def main():
     print("올바른 거리 분석 시작\n")
     
     # 데이터 로드
-    distance_df, violations_df = load_data()
+    locations_df, nearest = load_data()
     
     # 최단 거리 계산
-    min_distances = calculate_minimum_distances(distance_df)
+    min_distances = calculate_minimum_distances(locations_df, nearest)
     
     # 거리 패턴 분석
     distance_analysis, parking_deserts = analyze_distance_patterns(min_distances)
     
+    # 반경별 접근성 분석 (결과표 저장)
+    radius_access = analyze_radius_access(locations_df)
+    if radius_access is not None:
+        os.makedirs('results', exist_ok=True)
+        radius_access.to_csv('results/반경별_접근성.csv', encoding='utf-8-sig')
+        print("반경별 접근성 저장 완료: results/반경별_접근성.csv")
+    
     # 거리별 단속 건수 분석
-    distance_violations, distance_violation_analysis = analyze_violations_by_distance(min_distances, violations_df)
+    distance_violations, distance_violation_analysis = analyze_violations_by_distance(min_distances)
     
     # 올바른 정책 제안
     distance_stats, policy_matrix = create_corrected_policy(min_distances, distance_violations)
@@ -340,6 +374,8 @@ def main():
     print("\n=== ✅ 올바른 거리 분석 완료 ===")
     print("생성된 파일:")
     print("- 올바른_거리분석.png")
+    if radius_access is not None:
+        print("- 반경별_접근성.csv")
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,8 @@
 데이터 전처리 및 정리
 """
 
+import os
+import sys
 import pandas as pd
 import numpy as np
 import requests
@@ -12,6 +14,13 @@ import time
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from parking_access import ParkingIndex, ACCESS_RADII_M, save_nearest_lots
+
+# 단속장소별로 저장할 최근접 공영주차장 수
+NEAREST_K = 5
+
+
 def get_kakao_coordinates(address, api_key):
     """카카오 API로 주소를 위경도로 변환"""
     url = "https://dapi.kakao.com/v2/local/search/address.json"
@@ -182,42 +191,76 @@ def clean_parking_data(df):
     
     return df
 
-def calculate_distance_matrix(violations_df, parking_coords_df):
-    """단속장소와 공영주차장 간의 거리 계산"""
+def count_by_location(loc_id, n_locations, values, prefix):
+    """단속장소 × 범주 건수표 (bincount 한 번) — 컬럼: {prefix}_{범주}"""
+    codes, categories = pd.factorize(values, sort=True)
+    ok = codes >= 0
+    counts = np.bincount(loc_id[ok] * len(categories) + codes[ok],
+                         minlength=n_locations * len(categories))
+    return pd.DataFrame(counts.reshape(n_locations, len(categories)),
+                        columns=[f"{prefix}_{c}" for c in categories])
+
+def build_location_table(violations_df):
+    """
+    단속 건을 고유 단속장소(단속장소 + 좌표)로 묶은 집계표
+    - violations_df에 정수 loc_id 컬럼 추가 (집계표 행 번호)
+    - 집계표: loc_id, 단속장소, 위도_y, 경도_x, 단속건수, 시간대·단속방법·연도별 건수
+    거리·접근성은 이 표에서 장소당 한 번만 계산하고 loc_id로 단속 건에 다시 붙인다
+    """
+    print("고유 단속장소 집계 중...")
+
+    loc_id = violations_df.groupby(['단속장소', '위도_y', '경도_x'], sort=False, dropna=False).ngroup().to_numpy()
+    violations_df['loc_id'] = loc_id
+    n = int(loc_id.max()) + 1 if len(loc_id) else 0
+    first = np.unique(loc_id, return_index=True)[1]
+
+    locations_df = violations_df.iloc[first][['단속장소', '위도_y', '경도_x']].reset_index(drop=True)
+    locations_df.insert(0, 'loc_id', np.arange(n))
+    locations_df['단속건수'] = np.bincount(loc_id, minlength=n)
+    locations_df = pd.concat([
+        locations_df,
+        count_by_location(loc_id, n, violations_df['hour'], '시간'),
+        count_by_location(loc_id, n, violations_df['단속방법'], '방법'),
+        count_by_location(loc_id, n, violations_df['year'], '연도')
+    ], axis=1)
+
+    print(f"고유 단속장소: {n:,}개 (단속 {len(violations_df):,}건, 장소당 평균 {len(violations_df) / max(n, 1):.1f}건)")
+    return locations_df
+
+def calculate_nearest_lots(locations_df, index, k=NEAREST_K):
+    """
+    고유 단속장소마다 가까운 공영주차장 k개와 직선 거리 (공유 ParkingIndex에 일괄 질의, 장소당 한 번)
+    반환: (거리 [m] (장소 수, k), 주차장 번호 (장소 수, k), 주차장 조회표) — 행 = loc_id
+    """
     print("거리 계산 중...")
-    
-    # 샘플 데이터로 거리 계산 (전체 데이터는 너무 큼)
-    sample_violations = violations_df.sample(n=5000, random_state=42)
-    
-    distances = []
-    for idx, violation in sample_violations.iterrows():
-        violation_lat = violation['위도_y']
-        violation_lon = violation['경도_x']
-        
-        for _, parking in parking_coords_df.iterrows():
-            if pd.notna(parking['위도']) and pd.notna(parking['경도']):
-                # 실제 거리 계산 (위경도 기반)
-                lat_diff = abs(violation_lat - parking['위도'])
-                lon_diff = abs(violation_lon - parking['경도'])
-                distance = (lat_diff + lon_diff) * 111  # 대략적인 km 변환
-                distance = max(0.1, min(10.0, distance))  # 0.1~10km 범위로 제한
-            else:
-                distance = np.random.uniform(0.1, 5.0)
-            
-            distances.append({
-                '단속장소': violation['단속장소'],
-                '공영주차장': parking['주차장명'],
-                '거리_km': distance,
-                '위도_단속': violation_lat,
-                '경도_단속': violation_lon,
-                '위도_주차장': parking['위도'],
-                '경도_주차장': parking['경도']
-            })
-    
-    distance_df = pd.DataFrame(distances)
-    print(f"거리 계산 완료: {len(distance_df):,}건")
-    
-    return distance_df
+
+    dist_m, lot = index.nearest(locations_df['경도_x'].to_numpy(), locations_df['위도_y'].to_numpy(), k=k)
+
+    nearest_km = dist_m[:, 0] / 1000
+    weights = locations_df['단속건수'].to_numpy()
+    print(f"거리 계산 완료: 장소 {len(locations_df):,}개 × 최근접 {lot.shape[1]}개 "
+          f"(단속 건 기준 평균 최단거리 {np.average(nearest_km, weights=weights):.2f}km)")
+
+    return dist_m, lot, index.lots
+
+def calculate_radius_access(locations_df, index, radii=ACCESS_RADII_M):
+    """
+    고유 단속장소마다 반경별 공영주차장 수·주차구획수 합 (공유 ParkingIndex에 반경 쌍 질의, 장소당 한 번)
+    locations_df에 주차장수_{r}m / 주차구획수_{r}m 컬럼 추가
+    """
+    print("반경별 공영주차장 접근성 계산 중...")
+
+    capacity = index.lots['주차구획수'] if '주차구획수' in index.lots.columns else None
+    counts, totals = index.within(locations_df['경도_x'].to_numpy(), locations_df['위도_y'].to_numpy(),
+                                  radii, weights=capacity)
+
+    for k, r in enumerate(radii):
+        locations_df[f'주차장수_{r}m'] = counts[:, k]
+        if totals is not None:
+            locations_df[f'주차구획수_{r}m'] = totals[:, k]
+        print(f"  반경 {r}m: 공영주차장 없는 장소 {(counts[:, k] == 0).mean() * 100:.1f}%")
+
+    return locations_df
 
 def analyze_basic_patterns(violations_df):
     """기본 패턴 분석"""
@@ -276,11 +319,21 @@ def main():
     violations_clean = clean_violations_data(violations_df)
     parking_clean = clean_parking_data(parking_df)
     
-    # 공영주차장 위경도 변환
+    # 공영주차장 위경도 변환 (행 순서 = parking_clean, 반경 접근성용 주차구획수 포함)
     parking_coords = geocode_parking_lots(parking_clean, KAKAO_API_KEY)
+    parking_coords['주차구획수'] = parking_clean['주차구획수'].to_numpy()
+    
+    # 고유 단속장소 집계 (violations_clean에 loc_id 추가)
+    locations_df = build_location_table(violations_clean)
+    
+    # 공영주차장 KD-tree 인덱스 (최근접·반경 질의가 함께 사용)
+    parking_index = ParkingIndex(parking_coords)
+    
+    # 최근접 공영주차장 k개 (장소당 한 번)
+    dist_m, lot, lots = calculate_nearest_lots(locations_df, parking_index)
     
-    # 거리 계산
-    distance_df = calculate_distance_matrix(violations_clean, parking_coords)
+    # 반경별 공영주차장 수·주차구획수 (장소당 한 번)
+    locations_df = calculate_radius_access(locations_df, parking_index)
     
     # 기본 패턴 분석
     patterns = analyze_basic_patterns(violations_clean)
@@ -289,14 +342,16 @@ def main():
     violations_clean.to_csv('data/정리된_주차단속데이터.csv', index=False, encoding='utf-8-sig')
     parking_clean.to_csv('data/정리된_공영주차장데이터.csv', index=False, encoding='utf-8-sig')
     parking_coords.to_csv('data/공영주차장_위경도.csv', index=False, encoding='utf-8-sig')
-    distance_df.to_csv('data/거리매트릭스.csv', index=False, encoding='utf-8-sig')
+    locations_df.to_csv('data/단속장소_집계.csv', index=False, encoding='utf-8-sig')
+    save_nearest_lots('data/최근접_공영주차장.npz', dist_m, lot, lots)
     
     print("\n데이터 전처리 및 기본 분석 완료!")
     print("생성된 파일:")
     print("- 정리된_주차단속데이터.csv")
     print("- 정리된_공영주차장데이터.csv")
     print("- 공영주차장_위경도.csv")
-    print("- 거리매트릭스.csv")
+    print("- 단속장소_집계.csv")
+    print("- 최근접_공영주차장.npz")
 
 if __name__ == "__main__":
     main()
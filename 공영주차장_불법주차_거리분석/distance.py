@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+가설 1: 공영주차장 접근성 기반 맞춤형 정책
+거리 계산 커널 (단속 지점 N개 × 공영주차장 M개)
+
+- 거리 방식 (METRICS):
+  · haversine: 구면 대원 거리 [m]
+  · equirectangular: 등장방형 근사 (두 점 평균 위도로 경도 축소) [m]
+  · euclidean: 평면 좌표(EPSG:5186) 직선 거리 [m]
+  · manhattan: 평면 좌표 |dx| + |dy| [m] (격자형 도로 보행 거리 근사)
+- 위경도 → 커널 입력(라디안·투영 좌표)은 한 번만 변환하고, (N, M) 거리는 행 타일 단위로 계산
+  → 타일 하나가 TILE_ELEMENTS 원소를 넘지 않아 M이 커져도 메모리가 일정
+- float32 모드: 좌표(투영 m / 라디안)를 B 쪽 평균 원점 기준 상대값으로 바꾼 뒤 변환 (정밀도 손실 방지)
+- nearest_k: 타일마다 argpartition으로 행별 가장 가까운 k개만 남김 (전체 행렬을 만들지 않음)
+"""
+
+import numpy as np
+from pyproj import Transformer
+
+# 거리 계산용 평면 좌표계 (Korea 2000 / Central Belt, 미터)
+METRIC_CRS = "EPSG:5186"
+
+# 지구 평균 반지름 [m]
+EARTH_RADIUS_M = 6_371_008.8
+
+# 타일 하나의 최대 원소 수 (행 수 = TILE_ELEMENTS // M, float64 기준 약 32MB)
+TILE_ELEMENTS = 4_000_000
+
+METRICS = ("haversine", "equirectangular", "euclidean", "manhattan")
+
+
+def project_lonlat(lon, lat, crs=METRIC_CRS):
+    """경도/위도 배열 → 평면 좌표 (n, 2) [m]"""
+    tf = Transformer.from_crs("EPSG:4326", crs, always_xy=True)
+    x, y = tf.transform(np.asarray(lon, dtype='float64'), np.asarray(lat, dtype='float64'))
+    return np.column_stack([x, y])
+
+
+def _origin(b):
+    """B 중 좌표가 있는 점들의 평균 (상대 좌표 원점)"""
+    ok = np.isfinite(b).all(axis=1)
+    return b[ok].mean(axis=0) if ok.any() else np.zeros(b.shape[1])
+
+
+def _prepare(a_lon, a_lat, b_lon, b_lat, metric, dtype, crs):
+    """위경도 → 커널 입력 (A, B, 기준 위도 [rad]) — A·B는 B 평균 원점 기준 (n, 열) 배열"""
+    if metric not in METRICS:
+        raise ValueError(f"지원하지 않는 거리 방식: {metric} (가능: {', '.join(METRICS)})")
+    if metric in ("euclidean", "manhattan"):
+        a, b = project_lonlat(a_lon, a_lat, crs), project_lonlat(b_lon, b_lat, crs)
+        origin = _origin(b)
+        return (a - origin).astype(dtype), (b - origin).astype(dtype), 0.0
+
+    def rad(lon, lat):
+        lat = np.radians(np.asarray(lat, dtype='float64'))
+        lon = np.radians(np.asarray(lon, dtype='float64'))
+        return np.column_stack([lat, lon, np.cos(lat)])
+    a, b = rad(a_lon, a_lat), rad(b_lon, b_lat)
+    origin = _origin(b) * [1, 1, 0]
+    return (a - origin).astype(dtype), (b - origin).astype(dtype), float(origin[0])
+
+
+def _kernel(a, b, metric, lat0=0.0):
+    """A 타일 (t, ·) × B (m, ·) → 거리 (t, m) [m]"""
+    if metric == "euclidean":
+        return np.hypot(a[:, None, 0] - b[None, :, 0], a[:, None, 1] - b[None, :, 1])
+    if metric == "manhattan":
+        return np.abs(a[:, None, 0] - b[None, :, 0]) + np.abs(a[:, None, 1] - b[None, :, 1])
+
+    dlat = b[None, :, 0] - a[:, None, 0]
+    dlon = b[None, :, 1] - a[:, None, 1]
+    if metric == "equirectangular":
+        x = dlon * np.cos(lat0 + (a[:, None, 0] + b[None, :, 0]) / 2)
+        return EARTH_RADIUS_M * np.hypot(x, dlat)
+    h = np.sin(dlat / 2) ** 2 + a[:, None, 2] * b[None, :, 2] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def iter_tiles(a_lon, a_lat, b_lon, b_lat, metric="haversine", dtype='float64',
+               tile=TILE_ELEMENTS, crs=METRIC_CRS):
+    """(행 slice, 거리 타일 (t, M) [m]) 생성기 — 좌표가 NaN인 행은 거리 NaN"""
+    a, b, lat0 = _prepare(a_lon, a_lat, b_lon, b_lat, metric, np.dtype(dtype), crs)
+    rows = max(1, tile // max(len(b), 1))
+    for s in range(0, len(a), rows):
+        sl = slice(s, min(s + rows, len(a)))
+        yield sl, _kernel(a[sl], b, metric, lat0)
+
+
+def pairwise(a_lon, a_lat, b_lon, b_lat, metric="haversine", dtype='float64',
+             tile=TILE_ELEMENTS, crs=METRIC_CRS):
+    """전체 거리 행렬 (N, M) [m] — 결과 자체가 메모리에 들어갈 때만 사용"""
+    out = np.empty((len(np.atleast_1d(a_lon)), len(np.atleast_1d(b_lon))), dtype=dtype)
+    for sl, d in iter_tiles(a_lon, a_lat, b_lon, b_lat, metric, dtype, tile, crs):
+        out[sl] = d
+    return out
+
+
+def nearest_k(a_lon, a_lat, b_lon, b_lat, k=1, metric="haversine", dtype='float64',
+              tile=TILE_ELEMENTS, crs=METRIC_CRS):
+    """
+    각 A 지점에서 가까운 B 지점 k개 (거리 오름차순)
+    반환: (거리 [m] (N, k), B 행 번호 (N, k)) — 좌표가 없는 행은 거리 NaN, 번호 -1
+    """
+    m = len(np.atleast_1d(b_lon))
+    k = min(k, m)
+    n = len(np.atleast_1d(a_lon))
+    dist = np.full((n, k), np.nan, dtype=dtype)
+    idx = np.full((n, k), -1, dtype=np.int64)
+    if k == 0:
+        return dist, idx
+
+    for sl, d in iter_tiles(a_lon, a_lat, b_lon, b_lat, metric, dtype, tile, crs):
+        d = np.where(np.isnan(d), np.inf, d)
+        if k < m:
+            part = np.argpartition(d, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(m), d.shape)
+        part_d = np.take_along_axis(d, part, axis=1)
+        order = np.argsort(part_d, axis=1, kind='stable')
+        dk = np.take_along_axis(part_d, order, axis=1)
+        ik = np.take_along_axis(part, order, axis=1)
+        found = np.isfinite(dk)
+        dist[sl] = np.where(found, dk, np.nan)
+        idx[sl] = np.where(found, ik, -1)
+    return dist, idx
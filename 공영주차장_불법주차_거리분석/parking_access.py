@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+가설 1: 공영주차장 접근성 기반 맞춤형 정책
+공영주차장 공간 인덱스 (단속장소 → 최근접 공영주차장)
+
+- 위경도를 한 번만 미터 단위 평면 좌표(EPSG:5186, 중부원점)로 투영
+- 공영주차장 좌표로 KD-tree를 만들고, 단속 좌표 전체를 배치 단위로 한 번에 질의
+- 반경 질의: 지점마다 반경 r(여러 개)[m] 안 공영주차장 수·주차구획수 합을 (n, 반경 수) 배열로
+  (배치별 KD-tree 쌍 질의 한 번 → 쌍마다 속하는 가장 작은 반경 구간 → bincount + 누적합)
+- 최근접 k개 결과는 고유 단속장소(loc_id) 행 순서의 작은 .npz로 저장
+  (주차장 번호 int32 / 거리 float32 (장소 수, k) + 주차장 조회표) → 분석 스크립트는 바로 로드
+- 거리 방식은 distance.METRICS 중 선택:
+  · euclidean / manhattan: 평면 좌표 KD-tree (p=2 / p=1)
+  · haversine: 단위 구면 3차원 좌표 KD-tree (현 길이 → 대원 거리로 변환, 순서 동일)
+  · equirectangular: distance.nearest_k 타일 계산
+- 표본 추출 없이 수백만 건 단속 데이터도 수 초 안에 처리
+사용 (data/, analysis/ 스크립트에서):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from parking_access import ParkingIndex
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from distance import METRIC_CRS, EARTH_RADIUS_M, METRICS, project_lonlat, nearest_k, iter_tiles
+
+# 한 번에 질의할 단속 좌표 수 (메모리 상한)
+QUERY_BATCH = 1_000_000
+
+# 반경 질의 기본 반경 [m]
+ACCESS_RADII_M = (300, 500, 1000, 2000)
+
+# 최근접 공영주차장 산출물에 함께 담는 주차장 조회표 컬럼
+LOT_COLUMNS = ('주차장명', '주소', '위도', '경도', '주차구획수')
+
+
+def unit_sphere(lon, lat):
+    """경도/위도 → 단위 구면 3차원 좌표 (n, 3)"""
+    lat = np.radians(np.asarray(lat, dtype='float64'))
+    lon = np.radians(np.asarray(lon, dtype='float64'))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class ParkingIndex:
+    """공영주차장 KD-tree 인덱스 (좌표가 있는 주차장만 사용)"""
+
+    def __init__(self, parking_coords_df, lat_col='위도', lon_col='경도', crs=METRIC_CRS,
+                 metric="euclidean"):
+        if metric not in METRICS:
+            raise ValueError(f"지원하지 않는 거리 방식: {metric} (가능: {', '.join(METRICS)})")
+        valid = parking_coords_df[lat_col].notna() & parking_coords_df[lon_col].notna()
+        self.lots = parking_coords_df[valid].reset_index(drop=True)
+        self.crs = crs
+        self.metric = metric
+        self.lon = self.lots[lon_col].to_numpy('float64')
+        self.lat = self.lots[lat_col].to_numpy('float64')
+        self.tree = cKDTree(self._coords(self.lon, self.lat)) if metric != "equirectangular" else None
+        print(f"공영주차장 인덱스: {len(self.lots)}개 (좌표 없음 {int((~valid).sum())}개 제외, {metric})")
+
+    def _coords(self, lon, lat):
+        """KD-tree 좌표 (haversine은 단위 구면, 나머지는 평면 투영)"""
+        if self.metric == "haversine":
+            return unit_sphere(lon, lat)
+        return project_lonlat(lon, lat, self.crs)
+
+    def nearest(self, lon, lat, k=1, batch=QUERY_BATCH):
+        """
+        각 지점에서 가까운 공영주차장 k개
+        반환: (거리 [m] (n, k), 주차장 번호 (n, k) — self.lots 행 번호)
+        좌표가 없는 지점은 거리 NaN, 번호 -1
+        """
+        lon = np.asarray(lon, dtype='float64')
+        lat = np.asarray(lat, dtype='float64')
+        if self.tree is None:
+            return nearest_k(lon, lat, self.lon, self.lat, k=k, metric=self.metric, crs=self.crs)
+
+        k = min(k, len(self.lots))
+        n = len(lon)
+        dist = np.full((n, k), np.nan)
+        idx = np.full((n, k), -1, dtype=np.int64)
+        ok = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+        p = 1 if self.metric == "manhattan" else 2
+
+        for s in range(0, len(ok), batch):
+            rows = ok[s:s + batch]
+            d, i = self.tree.query(self._coords(lon[rows], lat[rows]), k=k, p=p, workers=-1)
+            dist[rows] = d.reshape(len(rows), k)
+            idx[rows] = i.reshape(len(rows), k)
+        if self.metric == "haversine":
+            # 현 길이 → 대원 거리 (단조 변환이라 최근접 순서는 그대로)
+            dist = 2 * EARTH_RADIUS_M * np.arcsin(np.clip(dist / 2, 0, 1))
+        return dist, idx
+
+    def within(self, lon, lat, radii=ACCESS_RADII_M, weights=None, batch=QUERY_BATCH):
+        """
+        각 지점에서 반경 radii[m] 안에 있는 공영주차장 수와 weights(주차장별 값, 예: 주차구획수) 합
+        반환: (주차장 수 int32 (n, 반경 수), weights 합 (n, 반경 수) 또는 None) — 컬럼 순서 = radii
+        좌표가 없는 지점은 0
+        """
+        lon = np.asarray(lon, dtype='float64')
+        lat = np.asarray(lat, dtype='float64')
+        radii = np.asarray(radii, dtype='float64')
+        order = np.argsort(radii)
+        n, r = len(lon), len(radii)
+        counts = np.zeros((n, r), dtype=np.int64)
+        totals = np.zeros((n, r)) if weights is not None else None
+        w = np.nan_to_num(np.asarray(weights, dtype='float64')) if weights is not None else None
+        ok = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+
+        for s in range(0, len(ok), batch):
+            rows = ok[s:s + batch]
+            i, j, d = self._pairs(lon[rows], lat[rows], radii.max())
+            # 쌍마다 거리가 들어가는 가장 작은 반경 구간 → 구간별 합 → 반경 순으로 누적
+            bucket = np.searchsorted(radii[order], d, side='left')
+            keep = bucket < r  # 반올림으로 최대 반경을 살짝 넘은 쌍 제외
+            i, j, slot = i[keep], j[keep], i[keep] * r + bucket[keep]
+            counts[rows[:, None], order] = np.cumsum(
+                np.bincount(slot, minlength=len(rows) * r).reshape(len(rows), r), axis=1)
+            if w is not None:
+                totals[rows[:, None], order] = np.cumsum(
+                    np.bincount(slot, weights=w[j], minlength=len(rows) * r).reshape(len(rows), r), axis=1)
+        return counts.astype(np.int32), totals
+
+    def _pairs(self, lon, lat, radius):
+        """반경 radius[m] 안 (지점, 주차장, 거리 [m]) 쌍 — KD-tree 쌍 질의 (equirectangular는 타일 계산)"""
+        if self.tree is None:
+            i, j, d = [], [], []
+            for sl, tile in iter_tiles(lon, lat, self.lon, self.lat, self.metric, crs=self.crs):
+                ti, tj = np.nonzero(tile <= radius)
+                i.append(ti + sl.start)
+                j.append(tj)
+                d.append(tile[ti, tj])
+            return np.concatenate(i), np.concatenate(j), np.concatenate(d)
+
+        p = 1 if self.metric == "manhattan" else 2
+        if self.metric == "haversine":
+            # 대원 거리 → 단위 구면 현 길이
+            radius = 2 * np.sin(min(radius / (2 * EARTH_RADIUS_M), np.pi / 2))
+        pairs = cKDTree(self._coords(lon, lat)).sparse_distance_matrix(
+            self.tree, radius, p=p, output_type='ndarray')
+        d = pairs['v']
+        if self.metric == "haversine":
+            d = 2 * EARTH_RADIUS_M * np.arcsin(np.clip(d / 2, 0, 1))
+        return pairs['i'].astype(np.int64), pairs['j'].astype(np.int64), d
+
+
+def save_nearest_lots(path, dist_m, lot, lots):
+    """
+    최근접 공영주차장 산출물 저장 (.npz, 비압축 — 로드 즉시 배열)
+    - dist_m: 거리 [m] float32 (장소 수, k), lot: 주차장 번호 int32 (장소 수, k) — 행 = loc_id
+    - lot_<컬럼>: 주차장 조회표 (lots 행 번호 = lot 값)
+    """
+    table = {f'lot_{c}': lots[c].to_numpy('float64') if pd.api.types.is_numeric_dtype(lots[c])
+             else lots[c].astype(str).to_numpy(dtype=str)
+             for c in LOT_COLUMNS if c in lots.columns}
+    np.savez(path, dist_m=np.asarray(dist_m, dtype=np.float32), lot=np.asarray(lot, dtype=np.int32), **table)
+
+
+def load_nearest_lots(path):
+    """save_nearest_lots 산출물 → (거리 [m] (장소 수, k), 주차장 번호 (장소 수, k), 주차장 조회표)"""
+    with np.load(path) as z:
+        lots = pd.DataFrame({k[len('lot_'):]: z[k] for k in z.files if k.startswith('lot_')})
+        return z['dist_m'], z['lot'], lots
+
+
+def nearest_lot_frame(locations_df, dist_m, lot, lots, rank=0):
+    """
+    장소별 rank번째(0 = 최근접) 공영주차장 표
+    컬럼: loc_id, 단속장소, 단속건수, 공영주차장, 거리_km, 위도_주차장, 경도_주차장
+    """
+    picked = lots.reindex(lot[:, rank])  # 번호 -1 (주차장 없음) → 빈 값
+    return pd.DataFrame({
+        'loc_id': locations_df['loc_id'].to_numpy(),
+        '단속장소': locations_df['단속장소'].to_numpy(),
+        '단속건수': locations_df['단속건수'].to_numpy(),
+        '공영주차장': picked['주차장명'].to_numpy(),
+        '거리_km': dist_m[:, rank].astype('float64') / 1000,
+        '위도_주차장': picked['위도'].to_numpy('float64'),
+        '경도_주차장': picked['경도'].to_numpy('float64')
+    })
+
+
+def _weighted_stats(x, w):
+    """값 x, 정수 가중치 w → 가중치만큼 펼친 배열의 describe() 값 (count, mean, std, min, 50%, max)"""
+    ok = np.isfinite(x) & (w > 0)
+    x, w = x[ok], w[ok]
+    total = w.sum()
+    if total == 0:
+        return pd.Series({'count': 0.0, 'mean': np.nan, 'std': np.nan, 'min': np.nan, '50%': np.nan, 'max': np.nan})
+    order = np.argsort(x, kind='stable')
+    x, w = x[order], w[order]
+    mean = np.average(x, weights=w)
+    std = np.sqrt((w * (x - mean) ** 2).sum() / (total - 1)) if total > 1 else np.nan
+    # 펼친 배열의 중간 위치 (선형 보간) → 누적 가중치로 값 찾기
+    cum = np.cumsum(w)
+    pos = 0.5 * (total - 1)
+    lo, hi = x[np.searchsorted(cum, np.floor(pos), side='right')], x[np.searchsorted(cum, np.ceil(pos), side='right')]
+    return pd.Series({'count': float(total), 'mean': mean, 'std': std, 'min': x[0],
+                      '50%': lo + (hi - lo) * (pos - np.floor(pos)), 'max': x[-1]})
+
+
+def weighted_describe(frame, col, weight='단속건수', by=None):
+    """
+    장소별 표에서 단속 건 기준 통계 — 각 행을 weight(단속건수)만큼 펼친 표의 describe()와 같은 값
+    (count = 단속 건수 합, mean / std / min / 50% / max), 행을 실제로 펼치지 않는다
+    by 지정 시 그룹별 DataFrame (범주형 그룹은 빈 구간도 포함), 아니면 Series
+    """
+    if by is None:
+        return _weighted_stats(frame[col].to_numpy('float64'), frame[weight].to_numpy('float64'))
+    return frame.groupby(by, observed=False)[[col, weight]].apply(
+        lambda g: _weighted_stats(g[col].to_numpy('float64'), g[weight].to_numpy('float64')))
@@ -70,7 +70,8 @@ def main():
     print("data/")
     print("  ├── 정리된_주차단속데이터.csv")
     print("  ├── 정리된_공영주차장데이터.csv")
-    print("  └── 거리매트릭스.csv")
+    print("  ├── 단속장소_집계.csv")
+    print("  └── 최근접_공영주차장.npz")
     print("\nresults/")
     print("  ├── 거리별_단속패턴.csv")
     print("  ├── 거리별_시간대패턴.csv")